@@ -0,0 +1,46 @@
+import sys
+import json
+import argparse
+import logging
+import logging.config
+
+from k2kvideo import batch
+
+
+logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='OCR many captured races in parallel')
+    parser.add_argument('races', help='JSON or JSON lines file of {"id", "laps", "rcw"}')
+    parser.add_argument('--workers', type=int, default=None, help='Default: number of CPUs')
+    parser.add_argument('--chunksize', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--lazy', action='store_true')
+    parser.add_argument('--trim', action='store_true')
+    parser.add_argument('--cache', action='store_true')
+    parser.add_argument('--mmap', action='store_true')
+    parser.add_argument('--model', default=None, help='Model file name, e.g. finalized_model_fast.npz')
+    parser.add_argument('--save-index', action='store_true', help='Save the time stamps next to the frames')
+    parser.add_argument('--skip-unchanged', action='store_true', help='Reuse predictions of unchanged digits')
+    parser.add_argument('--interpolate', action='store_true', help='Pick frames by capture time')
+    parser.add_argument('--from-index', action='store_true', help='Use timer readings from the capture index')
+    parser.add_argument('--output', default=None, help='Default: stdout')
+    args = parser.parse_args()
+
+    races = batch.load_races(args.races)
+    wfp = open(args.output, 'w') if args.output else sys.stdout
+
+    try:
+        for result in batch.run_batch(races, workers=args.workers, chunksize=args.chunksize,
+                                      batch_size=args.batch_size, lazy=args.lazy, trim=args.trim,
+                                      use_cache=args.cache, mmap=args.mmap, interpolate=args.interpolate,
+                                      from_index=args.from_index, skip_unchanged=args.skip_unchanged,
+                                      save_index=args.save_index, model=args.model):
+            wfp.write(json.dumps(result) + '\n')
+            wfp.flush()
+            logger.info('{} done in {:.2f} sec'.format(result['id'], result['elapsed']))
+    finally:
+        if wfp is not sys.stdout:
+            wfp.close()
@@ -0,0 +1,37 @@
+import time
+import argparse
+import logging
+import logging.config
+import multiprocessing
+
+from k2kvideo import batch
+
+
+logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure how the batch OCR runner scales with workers')
+    parser.add_argument('races', help='JSON or JSON lines file of {"id", "laps", "rcw"}')
+    parser.add_argument('--workers', type=int, action='append', default=None)
+    parser.add_argument('--chunksize', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--trim', action='store_true')
+    args = parser.parse_args()
+
+    races = batch.load_races(args.races)
+    cpus = multiprocessing.cpu_count()
+    workers_list = args.workers or sorted(set([1, 2, 4, cpus]))
+
+    base = None
+    for workers in workers_list:
+        start = time.perf_counter()
+        results = list(batch.run_batch(races, workers=workers, chunksize=args.chunksize,
+                                       batch_size=args.batch_size, trim=args.trim))
+        elapsed = time.perf_counter() - start
+        base = base or elapsed
+        errors = len([result for result in results if 'error' in result])
+        logger.info('workers {:2d} : {} races, {:.2f} sec, {:.2f} races/sec, x{:.2f}{}'.format(
+            workers, len(races), elapsed, len(races) / elapsed, base / elapsed,
+            ' ({} errors)'.format(errors) if errors else ''))
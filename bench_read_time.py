@@ -0,0 +1,51 @@
+import argparse
+import logging
+import logging.config
+import time
+
+from k2kvideo import ocr
+
+
+logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
+logger = logging.getLogger(__name__)
+
+
+def bench(ocr_ins, batch_size, repeat):
+    elapsed = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        time_stamps = ocr_ins.read_time(batch_size=batch_size)
+        elapsed.append(time.perf_counter() - start)
+
+    return min(elapsed), time_stamps
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare per-file and batched OCR of a captured race')
+    parser.add_argument('race_id')
+    parser.add_argument('--rcw', action='store_true')
+    parser.add_argument('--batch-size', type=int, action='append', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    ocr_ins = ocr.RpaJRAVideoReadTime(args.race_id, rcw=args.rcw)
+    store = ocr_ins.get_frame_store()
+    frames = len(ocr_ins.get_files()) if store is None else len(store)
+    if frames == 0:
+        raise SystemExit('No frames for {}'.format(args.race_id))
+
+    base_elapsed, base_stamps = bench(ocr_ins, None, args.repeat)
+    logger.info('per-file : {} frames, {:.3f} sec, {:.1f} frames/sec'.format(
+        frames, base_elapsed, frames / base_elapsed))
+
+    for batch_size in args.batch_size or [16, 64, 256, frames]:
+        elapsed, time_stamps = bench(ocr_ins, batch_size, args.repeat)
+        logger.info('batch {:4d} : {} frames, {:.3f} sec, {:.1f} frames/sec, x{:.2f}{}'.format(
+            batch_size, frames, elapsed, frames / elapsed, base_elapsed / elapsed,
+            '' if time_stamps == base_stamps else ' (MISMATCH)'))
+
+    ocr_ins = ocr.RpaJRAVideoReadTime(args.race_id, rcw=args.rcw, skip_unchanged=True)
+    elapsed, time_stamps = bench(ocr_ins, None, args.repeat)
+    logger.info('skip unchanged : {} frames, {:.3f} sec, {:.1f} frames/sec, x{:.2f}, {:.1%} skipped{}'.format(
+        frames, elapsed, frames / elapsed, base_elapsed / elapsed, ocr_ins.change_detector.get_skip_ratio(),
+        '' if time_stamps == base_stamps else ' (MISMATCH)'))
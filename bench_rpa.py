@@ -0,0 +1,71 @@
+import argparse
+import logging
+import logging.config
+
+from k2kvideo import rpa
+from k2kvideo import fakesite
+from k2kvideo import finish
+from k2kvideo import writer
+from k2kvideo import metrics
+
+
+logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the capture flow against a local fake JRA site')
+    parser.add_argument('--races', type=int, default=3)
+    parser.add_argument('--race-duration', type=float, default=20.0)
+    parser.add_argument('--iframe-delay', type=float, default=0.5)
+    parser.add_argument('--player-delay', type=float, default=1.0)
+    parser.add_argument('--resolution-failures', type=int, default=0)
+    parser.add_argument('--rcw', action='store_true')
+    parser.add_argument('--finish-tail', type=int, default=None, help='Stop N frames after the finish is read')
+    parser.add_argument('--writers', type=int, default=None, help='Write screenshots on N background threads')
+    parser.add_argument('--png-compression', type=int, default=None, help='Re-encode screenshots at this level')
+    parser.add_argument('--interval', type=float, default=None, help='Capture on a fixed deadline every N sec')
+    parser.add_argument('--prometheus', default=None, help='Prometheus textfile to write')
+    args = parser.parse_args()
+
+    # Spans accumulate over every race, the per race summaries go to metrics.json in each pic dir
+    total = metrics.Metrics()
+
+    finish_detector = None
+    if args.finish_tail is not None:
+        finish_detector = finish.RpaJRAVideoFinishDetector(rcw=args.rcw, tail=args.finish_tail)
+
+    screen_shot_writer = None
+    if args.writers is not None:
+        screen_shot_writer = writer.RpaJRAVideoScreenShotWriter(workers=args.writers,
+                                                                compression=args.png_compression)
+
+    with fakesite.FakeJRASite(race_duration=args.race_duration, iframe_delay=args.iframe_delay,
+                              player_delay=args.player_delay, rcw=args.rcw,
+                              resolution_failures=args.resolution_failures) as site:
+        rpa_ins = rpa.RpaJRAVideoFireFoxHeadless(landing_page_path='/tmp/k2kvideo_bench_landing_page.html',
+                                                 pic_dir_path='./pic/bench/{}', metrics=metrics.Metrics(),
+                                                 capture_interval=args.interval,
+                                                 finish_detector=finish_detector,
+                                                 screen_shot_writer=screen_shot_writer)
+        rpa_ins.JRA_RESULT_URL = site.get_result_url()
+
+        for i in range(args.races):
+            rpa_ins.start_automated_process('bench/{:02d}'.format(i))
+
+            total.merge(rpa_ins.metrics.get_summary())
+
+    summary = total.get_summary()
+    for name, span in sorted(summary['spans'].items()):
+        logger.info('{:24s} : {:4d} calls, mean {:.3f} sec, max {:.3f} sec'.format(
+            name, span['count'], span['total'] / span['count'], span['max']))
+    for name, value in sorted(summary['counters'].items()):
+        logger.info('{:24s} : {}'.format(name, value))
+
+    capture = summary['spans'].get('capture_video', {'total': 0.0})['total']
+    frames = summary['counters'].get('frames', 0)
+    if capture > 0:
+        logger.info('Captured {} frames in {:.2f} sec, {:.2f} frames/sec'.format(frames, capture, frames / capture))
+
+    if args.prometheus:
+        total.write_prometheus(args.prometheus, bench='rpa')
@@ -0,0 +1,23 @@
+import argparse
+import logging
+import logging.config
+
+from k2kvideo import framestore
+from k2kvideo import ocr
+
+
+logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pack captured PNG frames into a frame store')
+    parser.add_argument('race_id', nargs='+')
+    parser.add_argument('--rcw', action='store_true')
+    parser.add_argument('--remove-png', action='store_true',
+                        help='Delete the PNG frames once they are in the store, the store is read first either way')
+    args = parser.parse_args()
+
+    for race_id in args.race_id:
+        pic_dir = '{}/{}'.format(ocr.RpaJRAVideoReadTime.PIC_DIRE_PATH, race_id.replace('/', '-'))
+        framestore.convert_png_dir(pic_dir, rcw=args.rcw, remove_png=args.remove_png)
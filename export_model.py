@@ -0,0 +1,33 @@
+import os
+import sys
+import argparse
+import logging
+import logging.config
+
+from k2kvideo import model
+
+
+logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the digit model to NumPy and check parity')
+    parser.add_argument('--src', default=model.get_asset_path(model.MODEL_FILE_NAME))
+    parser.add_argument('--dst', default=model.get_asset_path(model.NUMPY_MODEL_FILE_NAME))
+    parser.add_argument('--pic-dir', help='Captured race directory used as parity samples')
+    parser.add_argument('--rcw', action='store_true')
+    args = parser.parse_args()
+
+    # Export next to the destination and only replace it once the parity check passed
+    tmp_path = '{}.{}.tmp.npz'.format(args.dst, os.getpid())
+    model.export_model(args.src, tmp_path)
+
+    samples = model.gen_parity_samples(args.pic_dir, args.rcw)
+    if model.check_parity(args.src, tmp_path, samples) != 0:
+        logger.error('NumPy model does not match {}, {} left untouched'.format(args.src, args.dst))
+        os.remove(tmp_path)
+        sys.exit(1)
+
+    os.replace(tmp_path, args.dst)
+    logger.info('Updated {}'.format(args.dst))
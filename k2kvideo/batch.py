@@ -0,0 +1,86 @@
+import json
+import time
+import logging
+import multiprocessing
+
+import cv2
+
+from k2kvideo.ocr import RpaJRAVideoReadTime
+from k2kvideo.model import find_model_file, model_registry
+
+logger = logging.getLogger(__name__)
+
+_options = {}
+
+
+def load_races(filename):
+    # Either a JSON list or JSON lines of {"id": ..., "laps": [...], "rcw": true}
+    with open(filename, 'r') as rfp:
+        contents = rfp.read().strip()
+
+    if contents.startswith('['):
+        return json.loads(contents)
+
+    return [json.loads(line) for line in contents.splitlines() if line.strip()]
+
+
+def init_worker(options, pooled=False):
+    global _options
+    _options = options
+
+    if pooled:
+        # Parallelism comes from the pool; extra OpenCV threads per worker would oversubscribe
+        cv2.setNumThreads(1)
+
+    # Load the model once per worker; every race of the worker shares it through the registry
+    RpaJRAVideoReadTime.MODEL_MMAP = options.get('mmap', False)
+    RpaJRAVideoReadTime.MODEL_NAME = options.get('model')
+    model_registry.get(find_model_file(RpaJRAVideoReadTime.MODEL_NAME), mmap=RpaJRAVideoReadTime.MODEL_MMAP)
+
+
+def process_race(race):
+    start = time.perf_counter()
+    result = {'id': race['id']}
+
+    try:
+        ocr = RpaJRAVideoReadTime(race['id'], rcw=race.get('rcw', False),
+                                  use_cache=_options.get('use_cache', False),
+                                  skip_unchanged=_options.get('skip_unchanged', False))
+        if race.get('laps') is not None:
+            result['snap_shots'] = ocr.find_snap_shop(race['laps'],
+                                                      batch_size=_options.get('batch_size'),
+                                                      lazy=_options.get('lazy', False),
+                                                      interpolate=_options.get('interpolate', False),
+                                                      from_index=_options.get('from_index', False))
+        if _options.get('save_index', False):
+            ocr.save_timestamp_index()
+        if _options.get('trim', False):
+            result['trimed'] = ocr.get_trimed_list(single_pass=True)
+    except Exception as e:
+        logger.error('{} : {}'.format(race['id'], e))
+        result['error'] = str(e)
+
+    result['elapsed'] = time.perf_counter() - start
+
+    return result
+
+
+def run_batch(races, workers=None, chunksize=1, **options):
+    # Results are yielded as each race completes, not in the order of races
+    if workers == 1:
+        init_worker(options)
+        for race in races:
+            yield process_race(race)
+        return
+
+    # A worker that cannot start is replaced forever, so a missing model fails here instead
+    find_model_file(options.get('model'))
+
+    pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(options, True))
+    try:
+        for result in pool.imap_unordered(process_race, races, chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,80 @@
+import os
+import json
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+_fingerprints = {}
+
+
+def get_model_fingerprint(filename):
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    if key not in _fingerprints:
+        with open(filename, 'rb') as rfp:
+            _fingerprints[key] = hashlib.sha1(rfp.read()).hexdigest()
+
+    return _fingerprints[key]
+
+
+class RpaJRAVideoReadTimeCache(object):
+    INDEX_FILE_NAME = '.ocr_cache.json'
+
+    def __init__(self, pic_dir, model_path, offset):
+        self.index_path = os.path.join(pic_dir, self.INDEX_FILE_NAME)
+        self.key = '{}:{}'.format(get_model_fingerprint(model_path), offset)
+        self.entries = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            with open(self.index_path, 'r') as rfp:
+                index = json.load(rfp)
+            if index.get('key') == self.key:
+                self.entries = index.get('entries', {})
+            else:
+                logger.info('OCR cache is invalidated : {}'.format(self.index_path))
+                self.dirty = True
+        except (IOError, OSError, ValueError):
+            pass
+
+    def get(self, filename):
+        entry = self.entries.get(os.path.basename(filename))
+        if entry is not None:
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                stat = None
+
+            if stat is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+                self.hits += 1
+                return entry['time'], entry['ts'], entry['additional']
+
+        self.misses += 1
+        return None
+
+    def put(self, filename, result):
+        stat = os.stat(filename)
+        time, time_int, is_additional_digit = result
+        self.entries[os.path.basename(filename)] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'time': time,
+            'ts': time_int,
+            'additional': is_additional_digit
+        }
+        self.dirty = True
+
+    def save(self):
+        if self.dirty == False or os.path.isdir(os.path.dirname(self.index_path)) == False:
+            return
+
+        tmp_path = '{}.tmp'.format(self.index_path)
+        with open(tmp_path, 'w') as wfp:
+            json.dump({'key': self.key, 'entries': self.entries}, wfp)
+        os.replace(tmp_path, self.index_path)
+
+        self.dirty = False
+        logger.debug('OCR cache saved : {} hits, {} misses'.format(self.hits, self.misses))
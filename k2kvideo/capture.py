@@ -0,0 +1,56 @@
+import time
+import logging
+
+import cv2
+import numpy as np
+
+from k2kvideo.ocr import RpaJRAVideoReadTime
+from k2kvideo.framestore import FrameStoreWriter
+
+logger = logging.getLogger(__name__)
+
+
+class RpaJRAVideoRoiCapture(object):
+    THUMBNAIL_SCALE = 0.125
+
+    def __init__(self, rcw=False):
+        self.offset = RpaJRAVideoReadTime.TIME_SEG_RCW_OFFSET if rcw else 0
+        self.pic_dir = None
+        self.roi_writer = None
+        self.thumb_writer = None
+
+    def start(self, pic_dir):
+        self.pic_dir = pic_dir
+
+    def get_frame_name(self, i):
+        return '{}/roi.bin:{:04d}'.format(self.pic_dir, i)
+
+    def add(self, i, png, captured=None):
+        # Only the timer strip and a thumbnail for scene detection are kept
+        if captured is None:
+            captured = time.monotonic()
+
+        img = cv2.imdecode(np.frombuffer(png, dtype=np.uint8), cv2.IMREAD_COLOR)
+        seg = RpaJRAVideoReadTime.TIME_SEG
+        roi = img[seg['top']:seg['bottom'], seg['left'] + self.offset:seg['right'] + self.offset]
+        thumb = cv2.resize(img, None, fx=self.THUMBNAIL_SCALE, fy=self.THUMBNAIL_SCALE,
+                           interpolation=cv2.INTER_AREA)
+
+        if self.roi_writer is None:
+            self.roi_writer = FrameStoreWriter(self.pic_dir, 'roi', roi.shape)
+            self.thumb_writer = FrameStoreWriter(self.pic_dir, 'thumb', thumb.shape)
+
+        self.roi_writer.append(i, roi, captured)
+        self.thumb_writer.append(i, thumb, captured)
+
+        return img
+
+    def finish(self):
+        if self.roi_writer is not None:
+            logger.info('Stored {} frames in {}'.format(self.roi_writer.count, self.pic_dir))
+            self.roi_writer.close()
+            self.thumb_writer.close()
+
+        self.pic_dir = None
+        self.roi_writer = None
+        self.thumb_writer = None
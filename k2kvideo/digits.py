@@ -0,0 +1,61 @@
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class DigitChangeDetector(object):
+    # A digit cell whose pixels did not change since it was last classified keeps that
+    # prediction; only changed cells go to the classifier, still in one predict call
+    def __init__(self, digit_count=4, tolerance=2.0):
+        self.digit_count = digit_count
+        self.tolerance = tolerance
+        self.reset()
+
+    def reset(self):
+        # Pixels of each cell as it was last classified, and the prediction it got
+        self.reference = None
+        self.previous_predicts = None
+        self.cells = 0
+        self.skipped = 0
+
+    def predict(self, clf, digits):
+        digits = np.asarray(digits)
+        frames = digits.reshape((-1, self.digit_count, digits.shape[-1]))
+        if len(frames) == 0:
+            return clf.predict(digits)
+
+        # Compared with the last classified pixels, not the previous frame, so a slow
+        # fade adds up until the cell is classified again
+        changed = np.ones(frames.shape[:2], dtype=bool)
+        reference = None if self.reference is None else self.reference.astype(np.int16)
+        for i, frame in enumerate(frames):
+            if reference is None:
+                reference = frame.astype(np.int16)
+                continue
+            changed[i] = np.abs(frame.astype(np.int16) - reference).mean(axis=1) > self.tolerance
+            reference[changed[i]] = frame[changed[i]]
+
+        predicts = np.empty(changed.shape, dtype=object)
+        if changed.any():
+            predicts[changed] = clf.predict(frames[changed])
+
+        # Unchanged cells take the prediction of the last changed frame of the same cell
+        rows = np.where(changed, np.arange(len(frames))[:, None], -1)
+        last = np.maximum.accumulate(rows, axis=0)
+        cols = np.broadcast_to(np.arange(self.digit_count), last.shape)
+        carried = last >= 0
+        predicts[~changed & carried] = predicts[last[~changed & carried], cols[~changed & carried]]
+        if (carried == False).any():
+            predicts[carried == False] = np.broadcast_to(self.previous_predicts, last.shape)[carried == False]
+
+        self.reference = reference.astype(frames.dtype)
+        self.previous_predicts = predicts[-1].copy()
+        self.cells += changed.size
+        self.skipped += int(changed.size - changed.sum())
+
+        return predicts.reshape(-1)
+
+    def get_skip_ratio(self):
+        return self.skipped / self.cells if self.cells else 0.0
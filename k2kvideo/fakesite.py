@@ -0,0 +1,193 @@
+import html
+import json
+import time
+import logging
+import threading
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG = {
+    'result_delay': 0.0,          # sec before the result page is served
+    'iframe_delay': 0.5,          # sec before the player iframe is inserted into the movie window
+    'player_delay': 1.0,          # sec before the resolution button shows up in the player
+    'resolution_failures': 0,     # clicks on the resolution button that open nothing
+    'race_start': 3.0,            # sec of video before the race timer starts
+    'race_duration': 95.0,        # sec the race timer runs
+    'finish_duration': 10.0,      # sec the finishing time is shown before the replay icon
+    'loading_at': None,           # sec of video when a loading stall begins
+    'loading_duration': 0.0,      # sec the loading icon is shown
+    'rcw': False,                 # timer on the right hand side like RpaJRAVideoReadTime(rcw=True)
+}
+
+RESULT_PAGE = '''<html><body>
+<p>Result : {cname}</p>
+<div class="movie_line"><a href="/movie?cname={cname}" target="_blank">Movie</a></div>
+</body></html>'''
+
+MOVIE_PAGE = '''<html><body style="margin:0">
+<script>
+setTimeout(function() {{
+    var iframe = document.createElement('iframe');
+    iframe.src = '/player';
+    iframe.style = 'position:absolute;top:0;left:0;width:100%;height:100%;border:0';
+    document.body.appendChild(iframe);
+}}, {iframe_delay_ms});
+</script>
+</body></html>'''
+
+PLAYER_PAGE = '''<html>
+<head><style>
+body {{ margin:0; background:#204020; font-family:monospace; }}
+.hidden {{ display:none; }}
+.eq-icon-resolution {{ position:absolute; top:600px; left:40px; width:40px; height:30px; background:#ccc; }}
+.eq-balloon-resolution {{ position:absolute; top:500px; left:40px; background:#fff; }}
+.eq-balloon-item {{ display:block; width:120px; height:30px; }}
+.eq-center-icon-play, .eq-center-icon-loading, .eq-center-icon-replay {{
+    position:absolute; top:300px; left:600px; width:80px; height:80px; background:#eee; }}
+#timer {{ position:absolute; top:42px; left:{timer_left}px; width:135px; height:40px; background:#000; }}
+.digit {{ position:absolute; top:0; width:26px; height:40px; color:#fff; font-size:36px;
+          line-height:40px; text-align:center; }}
+</style></head>
+<body>
+<div class="eq-icon-resolution hidden"></div>
+<div class="eq-balloon-resolution hidden">
+  <button class="eq-balloon-item">Low</button>
+  <button class="eq-balloon-item">High</button>
+</div>
+<div class="eq-center-icon-play hidden"></div>
+<div class="eq-center-icon-loading hidden"></div>
+<div class="eq-center-icon-replay hidden"></div>
+<div id="timer">
+  <div class="digit" style="left:8px"></div>
+  <div class="digit" style="left:45px"></div>
+  <div class="digit" style="left:71px"></div>
+  <div class="digit" style="left:108px"></div>
+</div>
+<script>
+var config = {config};
+var failures = config.resolution_failures;
+function $(name) {{ return document.getElementsByClassName(name)[0]; }}
+function show(name, shown) {{ $(name).classList.toggle('hidden', !shown); }}
+
+setTimeout(function() {{ show('eq-icon-resolution', true); }}, config.player_delay * 1000);
+$('eq-icon-resolution').onclick = function() {{
+    if (failures > 0) {{ failures--; return; }}
+    show('eq-balloon-resolution', true);
+}};
+document.getElementsByClassName('eq-balloon-item')[1].onclick = function() {{
+    show('eq-balloon-resolution', false);
+    show('eq-center-icon-play', true);
+}};
+$('eq-center-icon-play').onclick = function() {{
+    show('eq-center-icon-play', false);
+    play(performance.now());
+}};
+
+function render(digits) {{
+    var cells = document.getElementsByClassName('digit');
+    for (var i = 0; i < 4; i++) {{ cells[i].textContent = digits[i]; }}
+}}
+
+function play(started) {{
+    var stalled = 0;
+    var timer = setInterval(function() {{
+        var now = (performance.now() - started) / 1000 - stalled;
+        if (config.loading_at !== null && now >= config.loading_at && stalled < config.loading_duration) {{
+            show('eq-center-icon-loading', true);
+            stalled = Math.min(config.loading_duration, (performance.now() - started) / 1000 - config.loading_at);
+            return;
+        }}
+        show('eq-center-icon-loading', false);
+
+        var elapsed = Math.max(0, Math.min(now - config.race_start, config.race_duration));
+        var sec = Math.floor(elapsed);
+        var finished = now - config.race_start >= config.race_duration;
+        render([
+            sec >= 60 ? String(Math.floor(sec / 60)) : '',
+            sec >= 10 ? String(Math.floor(sec % 60 / 10)) : '',
+            sec >= 1 ? String(sec % 10) : '',
+            finished ? String(Math.floor(config.race_duration * 10) % 10) : ''
+        ]);
+
+        if (now >= config.race_start + config.race_duration + config.finish_duration) {{
+            clearInterval(timer);
+            show('eq-center-icon-replay', true);
+        }}
+    }}, 50);
+}}
+</script>
+</body></html>'''
+
+
+class FakeJRASiteHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def send_page(self, contents):
+        contents = contents.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(contents)))
+        self.end_headers()
+        self.wfile.write(contents)
+
+    def do_POST(self):
+        config = self.server.config
+        length = int(self.headers.get('Content-Length', 0))
+        cname = parse_qs(self.rfile.read(length).decode('utf-8')).get('cname', [''])[0]
+        self.server.requests.append(('result', cname, time.time()))
+
+        time.sleep(config['result_delay'])
+        self.send_page(RESULT_PAGE.format(cname=html.escape(cname)))
+
+    def do_GET(self):
+        config = self.server.config
+        path = urlparse(self.path).path
+
+        if path == '/movie':
+            self.send_page(MOVIE_PAGE.format(iframe_delay_ms=int(config['iframe_delay'] * 1000)))
+        elif path == '/player':
+            timer_left = 70 + (996 if config['rcw'] else 0)
+            self.send_page(PLAYER_PAGE.format(config=json.dumps(config), timer_left=timer_left))
+        else:
+            self.send_error(404)
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeJRASite(object):
+    def __init__(self, host='127.0.0.1', port=0, **config):
+        self.config = dict(DEFAULT_CONFIG)
+        self.config.update(config)
+
+        self.server = ThreadingHTTPServer((host, port), FakeJRASiteHandler)
+        self.server.config = self.config
+        self.server.requests = []
+        self.thread = None
+
+    def get_result_url(self):
+        host, port = self.server.server_address[:2]
+        return 'http://{}:{}/JRADB/accessS.html'.format(host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-jra-site')
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info('Fake JRA site : {}'.format(self.get_result_url()))
+
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,47 @@
+import logging
+
+import cv2
+
+from k2kvideo.ocr import RpaJRAVideoReadTime
+
+logger = logging.getLogger(__name__)
+
+
+class RpaJRAVideoFinishDetector(object):
+    # The timer grows a 1/10 sec digit once the finishing time is shown;
+    # capture can stop a few frames later instead of waiting for the replay icon
+    def __init__(self, rcw=False, check_every=5, tail=20, confirm=2):
+        self.rcw = rcw
+        self.check_every = check_every
+        self.tail = tail
+        self.confirm = confirm
+        self.ocr = None
+
+    def start(self, race_id):
+        self.ocr = RpaJRAVideoReadTime(race_id, rcw=self.rcw)
+        self.hits = 0
+        self.finish_frame = None
+
+    def put(self, i, filename, img=None):
+        if self.finish_frame is not None or i % self.check_every != 0:
+            return
+
+        if img is None:
+            img = cv2.imread(filename, 1)
+        if img is None:
+            return
+
+        time, time_int, is_additinal_digit = self.ocr.read_from_image(img)
+
+        # One frame with a stray digit is not a finish, e.g. a scene before the race
+        if is_additinal_digit and time_int > 0:
+            self.hits += 1
+        else:
+            self.hits = 0
+
+        if self.hits >= self.confirm:
+            self.finish_frame = i
+            logger.info('Finish detected at [{:04d}] : {}'.format(i, time))
+
+    def is_done(self, i):
+        return self.finish_frame is not None and i >= self.finish_frame + self.tail
@@ -0,0 +1,136 @@
+import os
+import re
+import glob
+import json
+import time
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_DTYPE = np.dtype([('frame', '<i4'), ('captured', '<f8')])
+
+
+def get_store_paths(store_dir, name):
+    return (os.path.join(store_dir, '{}.json'.format(name)),
+            os.path.join(store_dir, '{}.bin'.format(name)),
+            os.path.join(store_dir, '{}.idx'.format(name)))
+
+
+def is_frame_store(store_dir, name='roi'):
+    return os.path.isfile(get_store_paths(store_dir, name)[0])
+
+
+class FrameStoreWriter(object):
+    # One append-only file of fixed-shape frames plus an index of (frame number, capture time)
+    def __init__(self, store_dir, name, shape, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+
+        header_path, data_path, index_path = get_store_paths(store_dir, name)
+        with open(header_path, 'w') as wfp:
+            json.dump({'shape': list(self.shape), 'dtype': self.dtype.str}, wfp)
+
+        self.data_fp = open(data_path, 'wb')
+        self.index_fp = open(index_path, 'wb')
+
+    def append(self, frame, img, captured=None):
+        if img.shape != self.shape:
+            raise ValueError('Frame shape {} does not match the store {}'.format(img.shape, self.shape))
+
+        if captured is None:
+            captured = time.monotonic()
+
+        self.data_fp.write(np.ascontiguousarray(img, dtype=self.dtype).tobytes())
+        self.index_fp.write(np.array([(frame, captured)], dtype=INDEX_DTYPE).tobytes())
+        self.count += 1
+
+    def flush(self):
+        self.data_fp.flush()
+        self.index_fp.flush()
+
+    def close(self):
+        self.data_fp.close()
+        self.index_fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class FrameStoreReader(object):
+    def __init__(self, store_dir, name='roi'):
+        self.store_dir = store_dir
+        self.name = name
+
+        header_path, data_path, index_path = get_store_paths(store_dir, name)
+        with open(header_path, 'r') as rfp:
+            header = json.load(rfp)
+        self.shape = tuple(header['shape'])
+        self.dtype = np.dtype(header['dtype'])
+
+        index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+        frame_size = int(np.prod(self.shape)) * self.dtype.itemsize
+        # A writer killed mid-frame leaves a partial record; only complete frames are exposed
+        count = min(len(index), os.path.getsize(data_path) // frame_size)
+
+        self.frame = index['frame'][:count]
+        self.captured = index['captured'][:count]
+        if count:
+            self.frames = np.memmap(data_path, dtype=self.dtype, mode='r', shape=(count,) + self.shape)
+        else:
+            self.frames = np.zeros((0,) + self.shape, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __getitem__(self, key):
+        return self.frames[key]
+
+    def get_names(self):
+        return ['{}/{}.bin:{:04d}'.format(self.store_dir, self.name, frame) for frame in self.frame]
+
+
+def convert_png_dir(pic_dir, rcw=False, thumbnail_scale=0.125, remove_png=False):
+    from k2kvideo.ocr import RpaJRAVideoReadTime
+
+    offset = RpaJRAVideoReadTime.TIME_SEG_RCW_OFFSET if rcw else 0
+    seg = RpaJRAVideoReadTime.TIME_SEG
+
+    roi_writer = None
+    thumb_writer = None
+    files = sorted(glob.glob('{}/test_*.png'.format(pic_dir)))
+    for filename in files:
+        frame = int(re.search(r'test_(\d+)\.png$', filename).group(1))
+        img = cv2.imread(filename, 1)
+        roi = img[seg['top']:seg['bottom'], seg['left'] + offset:seg['right'] + offset]
+        thumb = cv2.resize(img, None, fx=thumbnail_scale, fy=thumbnail_scale, interpolation=cv2.INTER_AREA)
+
+        if roi_writer is None:
+            roi_writer = FrameStoreWriter(pic_dir, 'roi', roi.shape)
+            thumb_writer = FrameStoreWriter(pic_dir, 'thumb', thumb.shape)
+
+        captured = os.path.getmtime(filename)
+        roi_writer.append(frame, roi, captured)
+        thumb_writer.append(frame, thumb, captured)
+
+    if roi_writer is None:
+        logger.info('No frames in {}'.format(pic_dir))
+        return 0
+
+    roi_writer.close()
+    thumb_writer.close()
+    logger.info('Converted {} frames in {}'.format(roi_writer.count, pic_dir))
+
+    # The store is read before the PNGs, they are only kept for viewing
+    if remove_png:
+        for filename in files:
+            os.remove(filename)
+        logger.info('Removed {} PNG files in {}'.format(len(files), pic_dir))
+
+    return roi_writer.count
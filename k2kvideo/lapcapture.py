@@ -0,0 +1,80 @@
+import logging
+
+import cv2
+import numpy as np
+
+from k2kvideo.ocr import RpaJRAVideoReadTime
+
+logger = logging.getLogger(__name__)
+
+
+class RpaJRAVideoLapSchedule(object):
+    # Reads the timer of every captured frame and captures fast only around the
+    # expected lap boundaries; in between one frame per slow_interval is enough
+    # Origin estimates of the latest ticks, enough to outvote one misread tick
+    RECENT_TICKS = 3
+    def __init__(self, rcw=False, fast_interval=0.1, slow_interval=1.0, near=0.6):
+        self.rcw = rcw
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.near = near
+        self.laps = None
+
+    def start(self, race_id, laps=None):
+        self.ocr = RpaJRAVideoReadTime(race_id, rcw=self.rcw)
+        self.laps = laps
+        self.readings = {}
+        self.origins = []
+        self.origin = None
+        self.last = None
+
+        if laps is not None:
+            elapsed_time = np.cumsum(np.asarray(laps, dtype=np.float64)) / 10
+            self.boundaries = np.concatenate([[1.0], elapsed_time])
+
+    def is_active(self):
+        return self.laps is not None
+
+    def put(self, i, filename, img=None, captured=None):
+        if self.is_active() == False:
+            return
+
+        if img is None:
+            img = cv2.imread(filename, 1)
+        if img is None:
+            return
+
+        reading = self.ocr.read_from_image(img)
+        self.readings[i] = reading
+        time_int = reading[1]
+
+        # A tick from ts - 1 to ts happened between the two captures; its midpoint minus ts
+        # is when the timer showed 0. A loading stall moves it for the rest of the race,
+        # so only the latest ticks are used
+        if self.last is not None and captured is not None and time_int == self.last[0] + 1:
+            self.origins.append((self.last[1] + captured) / 2 - time_int)
+            self.origin = float(np.median(self.origins[-self.RECENT_TICKS:]))
+
+        if captured is not None:
+            self.last = (time_int, captured)
+
+    def get_interval(self, now):
+        if self.origin is None:
+            # Fast once the timer runs, so the first tick pins the origin down
+            running = self.last is not None and self.last[0] > 0
+            return self.fast_interval if running else self.slow_interval
+
+        elapsed = now - self.origin
+        upcoming = self.boundaries[self.boundaries > elapsed - self.near]
+        if len(upcoming) == 0:
+            return self.slow_interval
+
+        ahead = upcoming[0] - elapsed
+        if ahead <= self.near:
+            return self.fast_interval
+
+        # Wake up right when the next window opens
+        return min(self.slow_interval, max(self.fast_interval, ahead - self.near))
+
+    def get_reading(self, i):
+        return self.readings.get(i)
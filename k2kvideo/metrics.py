@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span(object):
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics(object):
+    # Disabled metrics hand out one shared no-op span, so instrumented code pays a method call only
+    def __init__(self, enabled=True, prometheus_path=None):
+        self.enabled = enabled
+        self.prometheus_path = prometheus_path
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.spans = {}
+            self.counters = {}
+
+    def span(self, name):
+        if self.enabled == False:
+            return NULL_SPAN
+
+        return Span(self, name)
+
+    def observe(self, name, elapsed):
+        with self.lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = {'count': 0, 'total': 0.0, 'max': 0.0}
+            span['count'] += 1
+            span['total'] += elapsed
+            span['max'] = max(span['max'], elapsed)
+
+    def incr(self, name, value=1):
+        if self.enabled == False:
+            return
+
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, summary):
+        # Adds up a get_summary() of other metrics, e.g. of one race, keeping its real max
+        if self.enabled == False:
+            return
+
+        with self.lock:
+            for name, other in summary['spans'].items():
+                span = self.spans.get(name)
+                if span is None:
+                    span = self.spans[name] = {'count': 0, 'total': 0.0, 'max': 0.0}
+                span['count'] += other['count']
+                span['total'] += other['total']
+                span['max'] = max(span['max'], other['max'])
+            for name, value in summary['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def get_summary(self):
+        with self.lock:
+            return {
+                'spans': dict((name, dict(span)) for name, span in self.spans.items()),
+                'counters': dict(self.counters)
+            }
+
+    def write_json(self, filename, **extra):
+        summary = self.get_summary()
+        summary.update(extra)
+
+        with open(filename, 'w') as wfp:
+            json.dump(summary, wfp, indent=2, sort_keys=True)
+
+    def write_prometheus(self, filename=None, **labels):
+        filename = filename or self.prometheus_path
+        summary = self.get_summary()
+        label_text = ','.join('{}="{}"'.format(key, value) for key, value in sorted(labels.items()))
+
+        def format_labels(**more):
+            pairs = [label_text] if label_text else []
+            pairs += ['{}="{}"'.format(key, value) for key, value in sorted(more.items())]
+            return '{{{}}}'.format(','.join(pairs)) if pairs else ''
+
+        lines = []
+        families = [('k2kvideo_stage_seconds_total', 'counter', 'total', '{:.6f}'),
+                    ('k2kvideo_stage_calls_total', 'counter', 'count', '{}'),
+                    ('k2kvideo_stage_seconds_max', 'gauge', 'max', '{:.6f}')]
+        for family, kind, key, value_format in families:
+            lines.append('# TYPE {} {}'.format(family, kind))
+            for name, span in sorted(summary['spans'].items()):
+                lines.append('{}{} {}'.format(family, format_labels(stage=name), value_format.format(span[key])))
+
+        lines.append('# TYPE k2kvideo_events_total counter')
+        for name, value in sorted(summary['counters'].items()):
+            lines.append('k2kvideo_events_total{} {}'.format(format_labels(event=name), value))
+
+        # The textfile collector may read at any time, so replace the file atomically
+        tmp_path = '{}.{}.tmp'.format(filename, os.getpid())
+        with open(tmp_path, 'w') as wfp:
+            wfp.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, filename)
@@ -0,0 +1,236 @@
+import os
+import sys
+import glob
+import time
+import struct
+import zipfile
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE_NAME = 'finalized_model.sav'
+NUMPY_MODEL_FILE_NAME = 'finalized_model.npz'
+FAST_MODEL_FILE_NAME = 'finalized_model_fast.npz'
+
+
+def get_grid_pixels(shape, step):
+    # Flat indices of the centre pixel of every step[0] x step[1] block of a shape[0] x shape[1] image
+    rows = np.arange(step[0] // 2, shape[0], step[0])
+    cols = np.arange(step[1] // 2, shape[1], step[1])
+
+    return (rows[:, None] * shape[1] + cols[None, :]).ravel()
+
+
+class NumpyLinearClassifier(object):
+    # With step set the model only looks at a grid of pixels of the digit image, fewer
+    # pixels to convert and multiply than the raw shape[0] x shape[1] features
+    def __init__(self, coef, intercept, classes, shape=None, step=None):
+        self.coef_ = np.ascontiguousarray(coef, dtype=np.float32)
+        self.intercept_ = np.ascontiguousarray(intercept, dtype=np.float32)
+        self.classes_ = np.asarray(classes)
+        self.shape_ = tuple(int(size) for size in shape) if shape is not None else None
+        self.step_ = tuple(int(size) for size in step) if step is not None else None
+        self.pixels_ = get_grid_pixels(self.shape_, self.step_) if step is not None else None
+
+    def transform(self, X):
+        if self.pixels_ is None:
+            return np.asarray(X, dtype=np.float32)
+
+        return np.take(X, self.pixels_, axis=1).astype(np.float32)
+
+    def decision_function(self, X):
+        X = self.transform(X)
+        return np.dot(X, self.coef_.T) + self.intercept_
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.decision_function(X), axis=1)]
+
+    @classmethod
+    def from_estimator(cls, clf):
+        return cls(clf.coef_, clf.intercept_, clf.classes_)
+
+    @classmethod
+    def load(cls, filename, mmap=False):
+        with np.load(filename) as npz:
+            shape = npz['shape_'] if 'shape_' in npz.files else None
+            step = npz['step_'] if 'step_' in npz.files else None
+            if mmap == False:
+                return cls(npz['coef_'], npz['intercept_'], npz['classes_'], shape, step)
+
+            classes = npz['classes_']
+
+        return cls(memmap_npz(filename, 'coef_'), memmap_npz(filename, 'intercept_'), classes, shape, step)
+
+    def set_read_only(self):
+        for array in (self.coef_, self.intercept_, self.classes_):
+            array.flags.writeable = False
+
+    def save(self, filename):
+        arrays = {'coef_': self.coef_, 'intercept_': self.intercept_, 'classes_': self.classes_}
+        if self.step_ is not None:
+            arrays['shape_'] = np.array(self.shape_)
+            arrays['step_'] = np.array(self.step_)
+
+        np.savez(filename, **arrays)
+
+
+def memmap_npz(filename, name):
+    # np.load ignores mmap_mode for .npz, so map the stored member of the zip directly
+    with zipfile.ZipFile(filename) as npz:
+        info = npz.getinfo('{}.npy'.format(name))
+
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError('"{}" in {} is compressed and cannot be memory-mapped'.format(name, filename))
+
+    with open(filename, 'rb') as rfp:
+        rfp.seek(info.header_offset)
+        header = rfp.read(30)
+        name_len, extra_len = struct.unpack('<2H', header[26:30])
+        rfp.seek(info.header_offset + 30 + name_len + extra_len)
+
+        version = np.lib.format.read_magic(rfp)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(rfp)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(rfp)
+        offset = rfp.tell()
+
+    return np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+def get_asset_path(filename):
+    import k2kvideo
+    return os.path.join(list(k2kvideo.__path__)[0], 'assets', filename)
+
+
+def find_model_file(name=None):
+    # A named model, e.g. FAST_MODEL_FILE_NAME, is looked up in the same places; a missing
+    # one is an error rather than a quiet switch to the default model
+    if name is not None:
+        for filename in (name, get_asset_path(name)):
+            if os.path.isfile(filename):
+                return filename
+
+        logger.error('Serialized file "{}" not found'.format(name))
+        raise IOError('Model "{}" not found in the working directory or {}'.format(name, get_asset_path('')))
+
+    for filename in (MODEL_FILE_NAME, NUMPY_MODEL_FILE_NAME):
+        if os.path.isfile(filename):
+            return filename
+
+    for filename in (NUMPY_MODEL_FILE_NAME, MODEL_FILE_NAME):
+        filename = get_asset_path(filename)
+        if os.path.isfile(filename):
+            return filename
+
+    logger.error('Serialized file "{}" not found'.format(MODEL_FILE_NAME))
+    return get_asset_path(MODEL_FILE_NAME)
+
+
+def load_joblib(filename, mmap=False):
+    try:
+        import joblib
+    except ImportError:
+        from sklearn.externals import joblib
+
+    # Models pickled with older scikit-learn refer to the since renamed module
+    import sklearn.svm
+    sys.modules.setdefault('sklearn.svm.classes', sklearn.svm)
+
+    if mmap:
+        return joblib.load(filename, mmap_mode='r')
+
+    return joblib.load(filename)
+
+
+def load_model(filename, mmap=False):
+    if filename.endswith('.npz'):
+        clf = NumpyLinearClassifier.load(filename, mmap=mmap)
+        clf.set_read_only()
+        return clf
+
+    return load_joblib(filename, mmap=mmap)
+
+
+class ModelRegistry(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.models = {}
+        self.hits = 0
+        self.misses = 0
+        self.load_time = 0.0
+
+    def get(self, filename, mmap=False):
+        key = (os.path.abspath(filename), mmap)
+
+        with self.lock:
+            clf = self.models.get(key)
+            if clf is not None:
+                self.hits += 1
+                return clf
+
+            self.misses += 1
+            start = time.perf_counter()
+            clf = load_model(filename, mmap=mmap)
+            elapsed = time.perf_counter() - start
+            self.load_time += elapsed
+            self.models[key] = clf
+
+        logger.debug('Model loaded : {} ({:.3f} sec)'.format(filename, elapsed))
+
+        return clf
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'models': len(self.models),
+                'hits': self.hits,
+                'misses': self.misses,
+                'load_time': self.load_time
+            }
+
+    def clear(self):
+        with self.lock:
+            self.models.clear()
+
+
+model_registry = ModelRegistry()
+
+
+def export_model(src, dst):
+    clf = NumpyLinearClassifier.from_estimator(load_joblib(src))
+    clf.save(dst)
+    logger.info('Exported {} to {} : {} classes, {} features'.format(
+        src, dst, len(clf.classes_), clf.coef_.shape[1]))
+
+    return clf
+
+
+def gen_parity_samples(pic_dir=None, rcw=False, count=1000):
+    from k2kvideo.ocr import RpaJRAVideoReadTime
+
+    size = RpaJRAVideoReadTime.UNIT_HIGHT * RpaJRAVideoReadTime.UNIT_WIDTH
+    samples = [np.random.RandomState(0).randint(0, 256, (count, size)).astype(np.uint8)]
+
+    if pic_dir is not None:
+        import cv2
+        ocr = RpaJRAVideoReadTime(os.path.basename(pic_dir), rcw=rcw)
+        for filename in sorted(glob.glob('{}/*.png'.format(pic_dir))):
+            samples.append(ocr.crop_digits(ocr.crop_roi(cv2.imread(filename, 1))))
+
+    return np.concatenate(samples)
+
+
+def check_parity(src, dst, samples):
+    expected = load_joblib(src).predict(samples)
+    actual = NumpyLinearClassifier.load(dst).predict(samples)
+
+    mismatch = int(np.count_nonzero(expected != actual))
+    logger.info('Parity : {} / {} samples mismatch'.format(mismatch, len(samples)))
+
+    return mismatch
+
@@ -1,13 +1,23 @@
+import os
+import csv
 import glob
-import os.path
 import logging.config
 
 import cv2
 import numpy as np
-from sklearn.externals import joblib
+
+from k2kvideo.cache import RpaJRAVideoReadTimeCache
+from k2kvideo.digits import DigitChangeDetector
+from k2kvideo.framestore import FrameStoreReader, is_frame_store
+from k2kvideo.metrics import Metrics
+from k2kvideo.model import find_model_file, model_registry
+from k2kvideo.timestamp import TimestampIndex
+from k2kvideo.trim import RpaJRAVideoTrimmer
+from k2kvideo.video import RpaJRAVideoFileReader
 
 logging.config.dictConfig({
     'version': 1,
+    'disable_existing_loggers': False,
     'formatters': {
         'k2k_formatter': {
             'format': '[%(filename)s:%(lineno)03d] %(message)s'
@@ -48,9 +58,25 @@ class RpaJRAVideoReadTime():
     THIRD_SEGMENT_OFFSET = (SECOND_SEGMENT_OFFSET + UNIT_WIDTH)
     FORTH_SEGMENT_OFFSET = (THIRD_SEGMENT_OFFSET + 11 + UNIT_WIDTH)
 
+    DIGIT_COUNT = 4
+
     PIC_DIRE_PATH = './pic'
+    CAPTURE_INDEX_FILE_NAME = 'capture_index.csv'
+    TIMESTAMP_INDEX_FILE_NAME = 'time_stamps.npz'
+
+    MODEL_MMAP = False
+    MODEL_NAME = None
+
+    STORE_BATCH_SIZE = 256
+
+    CHANGE_TOLERANCE = 2.0
+
+    VIDEO_INTERVAL = 0.5
+
+    def __init__(self, race_id, rcw=False, use_cache=False, metrics=None, skip_unchanged=False,
+                 video_path=None):
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
 
-    def __init__(self, race_id, rcw=False):
         if rcw:
             self.offset = self.TIME_SEG_RCW_OFFSET
         else:
@@ -58,30 +84,43 @@ class RpaJRAVideoReadTime():
 
         self.race_id = race_id.replace('/', '-')
 
-        filename = 'finalized_model.sav'
-        if os.path.isfile(filename) == False:
-            import k2kvideo
-            if type(k2kvideo.__path__) == list:
-                filename = '{}/assets/{}'.format(k2kvideo.__path__[0], filename)
-                if os.path.isfile(filename) == False:
-                    logging.error('Serialized file "{}" not found'.format(filename))
-                    # ToDo Raise an error
-            else:
-                logging.error('Serialized file "{}" not found'.format(filename))
-                # ToDo Raise an error
+        filename = find_model_file(self.MODEL_NAME)
 
         logging.debug('Serialized File : {}'. format(filename))
 
-        self.clf = joblib.load(filename)
+        self.model_path = filename
+        self.clf = model_registry.get(filename, mmap=self.MODEL_MMAP)
 
+        if use_cache:
+            self.cache = RpaJRAVideoReadTimeCache(
+                '{}/{}'.format(self.PIC_DIRE_PATH, self.race_id), self.model_path, self.offset)
+        else:
+            self.cache = None
 
-    def read_from_file(self, filename):
-        img = cv2.imread(filename, 1)
-        img = img[
+        self.timestamp_index = None
+
+        # A race recording replaces the captured frames of the pic dir
+        if video_path is not None:
+            self.video = RpaJRAVideoFileReader(video_path, self.get_roi_box(), self.VIDEO_INTERVAL)
+        else:
+            self.video = None
+
+        if skip_unchanged:
+            self.change_detector = DigitChangeDetector(self.DIGIT_COUNT, self.CHANGE_TOLERANCE)
+        else:
+            self.change_detector = None
+
+    def get_roi_box(self):
+        return (self.TIME_SEG['top'], self.TIME_SEG['bottom'],
+                self.TIME_SEG['left'] + self.offset, self.TIME_SEG['right'] + self.offset)
+
+    def crop_roi(self, img):
+        return img[
                 self.TIME_SEG['top']: self.TIME_SEG['bottom'],
                 self.TIME_SEG['left'] + self.offset: self.TIME_SEG['right'] + self.offset
               ]
 
+    def crop_digits(self, img):
         img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
         digits = []
@@ -99,10 +138,9 @@ class RpaJRAVideoReadTime():
                       self.BASE_OFFSET - self.FORTH_SEGMENT_OFFSET - 1:
                       len(img_gray[0]) - self.FORTH_SEGMENT_OFFSET - 1])
 
-        img_tgt = np.array(digits).reshape((-1, self.UNIT_HIGHT * self.UNIT_WIDTH))
-        predicts = (self.clf.predict(img_tgt))
-
+        return np.array(digits).reshape((-1, self.UNIT_HIGHT * self.UNIT_WIDTH))
 
+    def parse_predicts(self, predicts):
         time = ''
         time_int = 0
         is_additinal_digit = False
@@ -124,51 +162,267 @@ class RpaJRAVideoReadTime():
 
         return time, time_int, is_additinal_digit
 
+    def predict_digits(self, img_tgt):
+        with self.metrics.span('ocr_predict'):
+            if self.change_detector is None:
+                return self.clf.predict(img_tgt)
+
+            skipped = self.change_detector.skipped
+            predicts = self.change_detector.predict(self.clf, img_tgt)
+            self.metrics.incr('ocr_cells', len(img_tgt))
+            self.metrics.incr('ocr_cells_skipped', self.change_detector.skipped - skipped)
+
+            return predicts
+
+    def read_from_image(self, img):
+        img_tgt = self.crop_digits(self.crop_roi(img))
+        predicts = self.predict_digits(img_tgt)
+
+        return self.parse_predicts(predicts)
+
+    def read_from_file(self, filename):
+        if self.cache is not None:
+            result = self.cache.get(filename)
+            if result is not None:
+                self.metrics.incr('ocr_cache_hits')
+                return result
+
+        with self.metrics.span('ocr_decode'):
+            img = cv2.imread(filename, 1)
+        result = self.read_from_image(img)
+        if self.cache is not None:
+            self.cache.put(filename, result)
+
+        return result
+
+    def read_from_files(self, files):
+        if self.cache is not None:
+            results = [self.cache.get(file) for file in files]
+            missed = [file for file, result in zip(files, results) if result is None]
+            if missed:
+                missed_results = iter(self.predict_files(missed))
+                for i, file in enumerate(files):
+                    if results[i] is None:
+                        results[i] = next(missed_results)
+                        self.cache.put(file, results[i])
+
+            return results
+
+        return self.predict_files(files)
+
+    def predict_files(self, files):
+        # Stack the digits of every frame into one matrix so that predict is called once per chunk
+        img_tgt = np.empty((len(files) * self.DIGIT_COUNT, self.UNIT_HIGHT * self.UNIT_WIDTH), dtype=np.uint8)
+
+        for i, file in enumerate(files):
+            with self.metrics.span('ocr_decode'):
+                img = cv2.imread(file, 1)
+            img_tgt[i * self.DIGIT_COUNT:(i + 1) * self.DIGIT_COUNT] = self.crop_digits(self.crop_roi(img))
+
+        predicts = self.predict_digits(img_tgt)
+
+        return [self.parse_predicts(predicts[i * self.DIGIT_COUNT:(i + 1) * self.DIGIT_COUNT])
+                for i in range(len(files))]
+
+    def read_from_rois(self, rois):
+        if len(rois) == 0:
+            return []
+
+        img_tgt = np.empty((len(rois) * self.DIGIT_COUNT, self.UNIT_HIGHT * self.UNIT_WIDTH), dtype=np.uint8)
+        for i, roi in enumerate(rois):
+            img_tgt[i * self.DIGIT_COUNT:(i + 1) * self.DIGIT_COUNT] = self.crop_digits(roi)
+
+        predicts = self.predict_digits(img_tgt)
+
+        return [self.parse_predicts(predicts[i * self.DIGIT_COUNT:(i + 1) * self.DIGIT_COUNT])
+                for i in range(len(rois))]
+
+    def gen_time_stamp(self, file, time, time_int, is_addtional_digit):
+        time_stamp = {
+            'file': file,
+            'ts': time_int,
+            'time': time
+        }
+
+        if is_addtional_digit:
+            time_stamp['additional'] = True
+
+        return time_stamp
+
+    def get_files(self):
+        return sorted(glob.glob('{}/{}/*.png'.format(self.PIC_DIRE_PATH, self.race_id)))
+
+    def get_capture_times(self, files, store=None):
+        # Capture times come from the frame store index or the capture index the RPA side writes
+        if store is not None:
+            return [float(captured) for captured in store.captured]
+
+        path = '{}/{}/{}'.format(self.PIC_DIRE_PATH, self.race_id, self.CAPTURE_INDEX_FILE_NAME)
+        if os.path.exists(path) == False:
+            return None
+
+        with open(path, 'r') as rfp:
+            captured = dict((row['file'], float(row['captured'])) for row in csv.DictReader(rfp))
+
+        return [captured.get(os.path.basename(file)) for file in files]
 
+    def read_capture_index(self):
+        # Time stamps the capture side already read online, see RpaJRAVideoLapSchedule
+        path = '{}/{}/{}'.format(self.PIC_DIRE_PATH, self.race_id, self.CAPTURE_INDEX_FILE_NAME)
+        if os.path.exists(path) == False:
+            return None
 
-    def read_time(self):
+        with open(path, 'r') as rfp:
+            rows = list(csv.DictReader(rfp))
 
-        files = sorted(glob.glob('{}/{}/*.png'.format(self.PIC_DIRE_PATH, self.race_id)))
+        if len(rows) == 0 or rows[0].get('ts') is None:
+            return None
+
+        time_stamps = []
+        for row in rows:
+            if row['ts'] == '':
+                continue
+
+            file = '{}/{}/{}'.format(self.PIC_DIRE_PATH, self.race_id, row['file'])
+            time_stamp = self.gen_time_stamp(file, row['time'], int(row['ts']), row['additional'] == '1')
+            time_stamp['captured'] = float(row['captured'])
+            time_stamps.append(time_stamp)
+
+        return time_stamps
+
+    def get_frame_store(self):
+        if self.video is not None:
+            return self.video
+
+        store_dir = '{}/{}'.format(self.PIC_DIRE_PATH, self.race_id)
+        if is_frame_store(store_dir):
+            return FrameStoreReader(store_dir)
+
+        return None
+
+    def read_time(self, batch_size=None):
+
+        # A converted race keeps its PNGs until they are removed, the store is read first
+        store = self.get_frame_store()
+        files = self.get_files() if store is None else store.get_names()
 
         self.time_stamps = []
+        results = []
+
+        if self.change_detector is not None:
+            self.change_detector.reset()
+
+        if store is not None:
+            chunk = batch_size or self.STORE_BATCH_SIZE
+            for i in range(0, len(store), chunk):
+                results.extend(self.read_from_rois(store[i:i + chunk]))
+        elif batch_size is None:
+            results = (self.read_from_file(file) for file in files)
+        else:
+            for i in range(0, len(files), batch_size):
+                results.extend(self.read_from_files(files[i:i + batch_size]))
 
-        for file in files:
-            time, time_int, is_addtional_digit = self.read_from_file(file)
+        for file, (time, time_int, is_addtional_digit) in zip(files, results):
             logger.debug('Time : {}. Sec : {}'.format(time, time_int))
-            time_stamp = {
-                'file': file,
-                'ts': time_int,
-                'time': time
-            }
+            self.time_stamps.append(self.gen_time_stamp(file, time, time_int, is_addtional_digit))
+
+        capture_times = self.get_capture_times(files, store)
+        if capture_times is not None:
+            for time_stamp, captured in zip(self.time_stamps, capture_times):
+                if captured is not None:
+                    time_stamp['captured'] = captured
 
-            if is_addtional_digit:
-                time_stamp['additional'] = True
+        if self.change_detector is not None:
+            logger.info('Skipped {:.1%} of digit predictions'.format(self.change_detector.get_skip_ratio()))
 
-            self.time_stamps.append(time_stamp)
+        self.save_cache()
 
         return self.time_stamps
 
-    def find_snap_shop(self, laps):
-        time_output = []
+    def save_cache(self):
+        if self.cache is not None:
+            self.cache.save()
 
-        self.read_time()
+    def find_snap_shop(self, laps, batch_size=None, lazy=False, interpolate=False, from_index=False):
+        if lazy:
+            return self.find_snap_shop_lazy(laps)
 
-        for i in range(0, len(self.time_stamps)):
-            if self.time_stamps[i]['ts'] >= 1 :
-                time_output.append(self.time_stamps[i])
-                del self.time_stamps[:i+1]
-                break
+        time_stamps = self.read_capture_index() if from_index else None
+        if time_stamps is not None:
+            self.time_stamps = time_stamps
+        else:
+            self.read_time(batch_size=batch_size)
+        self.timestamp_index = TimestampIndex.from_time_stamps(self.time_stamps)
+
+        if interpolate:
+            return self.timestamp_index.find_snap_shop_interpolated(laps)
+
+        return self.timestamp_index.find_snap_shop(laps)
+
+    def get_timestamp_index_path(self):
+        return '{}/{}/{}'.format(self.PIC_DIRE_PATH, self.race_id, self.TIMESTAMP_INDEX_FILE_NAME)
+
+    def save_timestamp_index(self, filename=None):
+        if self.timestamp_index is None:
+            self.timestamp_index = TimestampIndex.from_time_stamps(self.read_time())
+
+        self.timestamp_index.save(filename or self.get_timestamp_index_path())
+
+    def load_timestamp_index(self, filename=None):
+        filename = filename or self.get_timestamp_index_path()
+        if os.path.exists(filename) == False:
+            return None
+
+        self.timestamp_index = TimestampIndex.load(filename)
+
+        return self.timestamp_index
+
+    def find_snap_shop_lazy(self, laps):
+        # The race timer only counts up, so each lap boundary is found by bisection
+        # and only the probed frames are decoded
+        store = self.get_frame_store()
+        files = self.get_files() if store is None else store.get_names()
+        results = {}
+
+        def read(index):
+            if index not in results:
+                if store is not None:
+                    results[index] = self.read_from_rois(store[index:index + 1])[0]
+                else:
+                    results[index] = self.read_from_file(files[index])
+                logger.debug('Probe[{:04d}] : {}'.format(index, results[index][0]))
+            return results[index]
+
+        def search(lo, second):
+            hi = len(files)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if read(mid)[1] >= second:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            return lo
+
+        time_output = []
+
+        start = 0
+        index = search(start, 1)
+        if index < len(files):
+            time_output.append(self.gen_time_stamp(files[index], *read(index)))
+            start = index + 1
 
         elapsed_time = 0
         for lap in laps:
             elapsed_time += lap
             second = int(elapsed_time / 10)
-            for i in range(0, len(self.time_stamps)):
-                if self.time_stamps[i]['ts'] >= second:
-                    time_output.append(self.time_stamps[i])
-                    del self.time_stamps[:i + 1]
-                    break
+            index = search(start, second)
+            if index < len(files):
+                time_output.append(self.gen_time_stamp(files[index], *read(index)))
+                start = index + 1
 
+        logger.debug('Probed {} / {} frames'.format(len(results), len(files)))
+
+        self.save_cache()
 
         return time_output
 
@@ -204,9 +458,35 @@ class RpaJRAVideoReadTime():
 
         return candidate
 
-    def get_trimed_list(self):
+    def get_trimed_list_from_store(self):
+        # The timer strip is in the roi store and the thumbnails give the scene histograms
+        store_dir = '{}/{}'.format(self.PIC_DIRE_PATH, self.race_id)
+        if is_frame_store(store_dir) == False or is_frame_store(store_dir, 'thumb') == False:
+            logger.info('No frames for {}'.format(self.race_id))
+            return []
+
+        roi_store = FrameStoreReader(store_dir)
+        thumb_store = FrameStoreReader(store_dir, 'thumb')
+        files = roi_store.get_names()[:min(len(roi_store), len(thumb_store))]
+
+        return RpaJRAVideoTrimmer(self, stores=(roi_store, thumb_store)).get_trimed_list(files)
+
+    def get_trimed_list(self, single_pass=False):
+
+        if self.video is not None:
+            return RpaJRAVideoTrimmer(self, load=self.video.load).get_trimed_list(self.video.get_names())
 
-        files = sorted(glob.glob('{}/{}/test_*.png'.format(self.PIC_DIRE_PATH, self.race_id)))
+        store_dir = '{}/{}'.format(self.PIC_DIRE_PATH, self.race_id)
+        if is_frame_store(store_dir) and is_frame_store(store_dir, 'thumb'):
+            return self.get_trimed_list_from_store()
+
+        files = sorted(glob.glob('{}/test_*.png'.format(store_dir)))
+
+        if len(files) == 0:
+            return self.get_trimed_list_from_store()
+
+        if single_pass:
+            return RpaJRAVideoTrimmer(self).get_trimed_list(files)
 
         for i, filename in enumerate(files):
             timestamp, timestamp_ss, is_additional_digit = self.read_from_file(filename)
@@ -238,4 +518,6 @@ class RpaJRAVideoReadTime():
                 trimed.reverse()
                 break
 
+        self.save_cache()
+
         return trimed
@@ -0,0 +1,92 @@
+import queue
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+from k2kvideo.ocr import RpaJRAVideoReadTime
+
+logger = logging.getLogger(__name__)
+
+
+class RpaJRAVideoOcrPipeline(object):
+    # OCR runs on a worker thread; cv2 and NumPy release the GIL so the capture loop keeps going
+    def __init__(self, rcw=False, max_queue=64, batch_size=8):
+        self.rcw = rcw
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.worker = None
+
+    def start(self, race_id):
+        self.ocr = RpaJRAVideoReadTime(race_id, rcw=self.rcw)
+        self.queue = queue.Queue(maxsize=self.max_queue)
+        self.time_stamps = []
+        self.error = None
+
+        self.worker = threading.Thread(target=self.run, name='ocr-{}'.format(self.ocr.race_id))
+        self.worker.daemon = True
+        self.worker.start()
+
+    def put(self, filename, img=None):
+        # Blocks when the worker falls behind so memory stays bounded
+        self.queue.put((filename, img))
+
+    def get_batch(self):
+        batch = [self.queue.get()]
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def run(self):
+        finished = False
+        while finished == False:
+            batch = self.get_batch()
+            if batch[-1] is None:
+                batch.pop()
+                finished = True
+
+            if self.error is not None or len(batch) == 0:
+                continue
+
+            try:
+                self.process(batch)
+            except Exception as e:
+                logger.error(e)
+                self.error = e
+
+    def process(self, batch):
+        digit_count = self.ocr.DIGIT_COUNT
+        img_tgt = np.empty((len(batch) * digit_count, self.ocr.UNIT_HIGHT * self.ocr.UNIT_WIDTH),
+                           dtype=np.uint8)
+
+        for i, (filename, img) in enumerate(batch):
+            if img is None:
+                img = cv2.imread(filename, 1)
+            img_tgt[i * digit_count:(i + 1) * digit_count] = self.ocr.crop_digits(self.ocr.crop_roi(img))
+
+        predicts = self.ocr.clf.predict(img_tgt)
+
+        for i, (filename, img) in enumerate(batch):
+            time, time_int, is_addtional_digit = self.ocr.parse_predicts(
+                predicts[i * digit_count:(i + 1) * digit_count])
+            self.time_stamps.append(self.ocr.gen_time_stamp(filename, time, time_int, is_addtional_digit))
+
+    def finish(self, timeout=None):
+        if self.worker is None:
+            return []
+
+        self.queue.put(None)
+        self.worker.join(timeout)
+        if self.worker.is_alive():
+            logger.error('OCR pipeline did not drain in time')
+        self.worker = None
+
+        if self.error is not None:
+            raise self.error
+
+        return sorted(self.time_stamps, key=lambda time_stamp: time_stamp['file'])
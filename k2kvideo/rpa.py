@@ -1,13 +1,19 @@
 import os
+import json
 import shutil
 import logging.config
-from time import sleep
+from time import sleep, monotonic
+
+import cv2
+import numpy as np
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common import exceptions
 from selenium.webdriver.support.ui import WebDriverWait
 
+from k2kvideo.metrics import Metrics
+
 
 FILE_PATH = '/tmp/k2kvideo_landing_page.html'
 PIC_DIRE_PATH = './pic/{}'
@@ -53,37 +59,91 @@ class RpaJRAVideoPlayObserveTimeout(Exception):
 class RpaJRAVideoPlayFail(Exception):
     pass
 
+def is_document_ready(browser):
+    return browser.execute_script('return document.readyState') == 'complete'
+
+
 class RpaJRAVideo(object):
+    JRA_RESULT_URL = 'http://www.jra.go.jp/JRADB/accessS.html'
+
+    # Poll for the page state instead of sleeping a fixed time; False restores the fixed sleeps
+    EVENT_DRIVEN_WAITS = True
+    WAIT_POLL_INTERVAL = 0.1
+    WAIT_TIMEOUT = 10
+    # Shortest pause between two clicks on the resolution button
+    RESOLUTION_RETRY_INTERVAL = 0.5
+
+    CAPTURE_INDEX_FILE_NAME = 'capture_index.csv'
+
+    def __init__(self, ocr_pipeline=None, roi_capture=None, session_pool=None,
+                 landing_page_path=FILE_PATH, pic_dir_path=PIC_DIRE_PATH, metrics=None,
+                 capture_interval=None, check_every=4, finish_detector=None, lap_schedule=None,
+                 screen_shot_writer=None):
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.capture_interval = capture_interval
+        self.check_every = check_every
+        self.landing_page_path = landing_page_path
+        self.pic_dir_path = pic_dir_path
+        self.ocr_pipeline = ocr_pipeline
+        self.roi_capture = roi_capture
+        self.finish_detector = finish_detector
+        self.lap_schedule = lap_schedule
+        self.screen_shot_writer = screen_shot_writer
+        self.session_pool = session_pool
+        self.browser = None
+        self.time_stamps = None
+
     def get_driver(self):
         pass
 
     def safty_wait(self):
-        sleep(0.5)
+        with self.metrics.span('safty_wait'):
+            sleep(0.5)
 
     def safty_long_wait(self):
-        sleep(2.0)
+        with self.metrics.span('safty_long_wait'):
+            sleep(2.0)
+
+    def wait_for(self, name, condition, fallback, timeout=None):
+        if self.EVENT_DRIVEN_WAITS == False:
+            fallback()
+            return True
+
+        with self.metrics.span('wait_{}'.format(name)):
+            try:
+                WebDriverWait(self.browser, timeout or self.WAIT_TIMEOUT,
+                              poll_frequency=self.WAIT_POLL_INTERVAL).until(condition)
+                ready = True
+            except exceptions.TimeoutException:
+                logger.info('Timed out waiting for {}'.format(name))
+                self.metrics.incr('wait_timeouts')
+                ready = False
+
+        logger.debug('Waited for {} : {}'.format(name, ready))
+
+        return ready
 
     def get_pic_dir_path(self):
         return self.pic_dir
 
     def gen_pic_dir(self, race_id):
         race_id = race_id.replace('/', '-')
-        self.pic_dir = PIC_DIRE_PATH.format(race_id)
+        self.pic_dir = self.pic_dir_path.format(race_id)
         if os.path.isdir(self.pic_dir):
             shutil.rmtree(self.pic_dir)
 
-        os.mkdir(self.pic_dir)
+        os.makedirs(self.pic_dir)
 
     def gen_landing_page(self, race_id):
-        with open(FILE_PATH, 'w') as wfp:
+        with open(self.landing_page_path, 'w') as wfp:
             template =  '<html>' \
-                        '     <form action="http://www.jra.go.jp/JRADB/accessS.html" method="post">' \
+                        '     <form action="{}" method="post">' \
                         '     <input type="hidden" name="cname" value="{}"/>' \
                         '     <input type="submit" value="POST" id="btn"/>'\
                         '     </form>'\
                         '</html>'\
 
-            contents = template.format(race_id)
+            contents = template.format(self.JRA_RESULT_URL, race_id)
             wfp.write(contents)
 
     def invoke_jra_result(self):
@@ -131,7 +191,17 @@ class RpaJRAVideo(object):
                     logger.info('ElementClickInterceptedException')
                 except exceptions.ElementNotInteractableException:
                     logger.info('ElementNotInteractableException')
-                sleep(0.5)
+                self.metrics.incr('resolution_retries')
+
+                # A half open balloon takes the next click, let it close first. Whatever
+                # intercepted the click may still be there, so never retry sooner than the interval
+                retry_at = monotonic() + self.RESOLUTION_RETRY_INTERVAL
+                self.wait_for('resolution_retry',
+                              EC.invisibility_of_element_located((By.CLASS_NAME, 'eq-balloon-resolution')),
+                              lambda: None, timeout=2)
+                remaining = retry_at - monotonic()
+                if remaining > 0:
+                    sleep(remaining)
 
             else:
                 raise RpaJRAVideoPlayTimeout
@@ -153,6 +223,54 @@ class RpaJRAVideo(object):
         except exceptions.TimeoutException:
             raise RpaJRAVideoPlayTimeout
 
+    def save_screen_shot(self, pic_dir, i, captured=None):
+        if self.roi_capture is not None:
+            # Keep the screenshot in memory and store only the timer strip and a thumbnail
+            filename = self.roi_capture.get_frame_name(i)
+            with self.metrics.span('screenshot'):
+                png = self.browser.get_screenshot_as_png()
+            with self.metrics.span('roi_store'):
+                img = self.roi_capture.add(i, png, captured)
+        elif self.screen_shot_writer is not None:
+            filename = '{}/test_{:04d}.png'.format(pic_dir, i)
+            with self.metrics.span('screenshot'):
+                png = self.browser.get_screenshot_as_png()
+            self.screen_shot_writer.put(filename, png)
+
+            # The file may not be written yet, whoever reads the frame now gets it decoded
+            img = None
+            if self.ocr_pipeline is not None or self.finish_detector is not None or self.lap_schedule is not None:
+                with self.metrics.span('screenshot_decode'):
+                    img = cv2.imdecode(np.frombuffer(png, dtype=np.uint8), cv2.IMREAD_COLOR)
+        else:
+            filename = '{}/test_{:04d}.png'.format(pic_dir, i)
+            img = None
+            with self.metrics.span('screenshot'):
+                self.browser.get_screenshot_as_file(filename)
+
+        self.metrics.incr('frames')
+
+        if self.ocr_pipeline is not None:
+            self.ocr_pipeline.put(filename, img)
+
+        if self.finish_detector is not None:
+            with self.metrics.span('finish_check'):
+                self.finish_detector.put(i, filename, img)
+
+        if self.lap_schedule is not None:
+            with self.metrics.span('lap_check'):
+                self.lap_schedule.put(i, filename, img, captured)
+
+        return filename
+
+    def is_finish_captured(self, i):
+        if self.finish_detector is None or self.finish_detector.is_done(i) == False:
+            return False
+
+        logger.info('Stop capture {} frames after the finish'.format(self.finish_detector.tail))
+        self.metrics.incr('early_stops')
+        return True
+
     def observe_video(self):
         logger.info('Video Start')
 
@@ -165,7 +283,7 @@ class RpaJRAVideo(object):
                     EC.visibility_of_element_located((By.CLASS_NAME, 'eq-center-icon-replay')))
                 break
             except exceptions.TimeoutException:
-                self.browser.get_screenshot_as_file('{}/test_{:04d}.png'.format(pic_dir, i))
+                self.save_screen_shot(pic_dir, i)
                 try :
                     loading = self.browser.find_element_by_class_name('eq-center-icon-loading')
                     if loading == None or loading.is_displayed() == False:
@@ -195,7 +313,10 @@ class RpaJRAVideo(object):
         pic_dir = self.get_pic_dir_path()
 
         for i in range(MAX_SCREEN_SHOT_COUNTER):
-            self.browser.get_screenshot_as_file('{}/test_{:04d}.png'.format(pic_dir, i))
+            self.save_screen_shot(pic_dir, i)
+            if self.is_finish_captured(i):
+                break
+
             replay = self.browser.find_element_by_class_name('eq-center-icon-replay')
             if replay != None and replay.is_displayed() == True:
                 break
@@ -216,10 +337,112 @@ class RpaJRAVideo(object):
 
         logger.info('Video End')
 
+    def is_replay_shown(self):
+        replay = self.browser.find_element_by_class_name('eq-center-icon-replay')
+        return replay != None and replay.is_displayed() == True
+
+    def is_loading_shown(self):
+        loading = self.browser.find_element_by_class_name('eq-center-icon-loading')
+        return loading != None and loading.is_displayed() == True
+
+    def is_lap_schedule_active(self):
+        return self.lap_schedule is not None and self.lap_schedule.is_active()
+
+    def get_capture_interval(self, captured):
+        if self.is_lap_schedule_active():
+            return self.lap_schedule.get_interval(captured)
+
+        return self.capture_interval
+
+    def capture_video_scheduled(self):
+        # Each frame is due one interval after the previous deadline, so a slow screenshot
+        # delays one frame instead of shifting every following one
+        logger.info('Video Start')
+        loading_timer = 0
+        interval = self.get_capture_interval(monotonic())
+        check_every = max(1, self.check_every)
+
+        pic_dir = self.get_pic_dir_path()
+        capture_index = []
+
+        start = deadline = monotonic()
+        try:
+            for i in range(MAX_SCREEN_SHOT_COUNTER):
+                delay = deadline - monotonic()
+                if delay < -interval:
+                    # Slots missed during a stall are skipped up to the next one still ahead,
+                    # replaying them back to back would only capture the same screen again
+                    missed = int(-delay // interval) + 1
+                    self.metrics.incr('late_frames', missed)
+                    deadline += missed * interval
+                    delay = deadline - monotonic()
+                if delay > 0:
+                    sleep(delay)
+
+                captured = monotonic()
+                filename = self.save_screen_shot(pic_dir, i, captured)
+                capture_index.append((i, os.path.basename(filename), captured))
+                if self.is_finish_captured(i):
+                    break
+
+                interval = self.get_capture_interval(captured)
+                deadline += interval
+
+                if i % 10 == 0:
+                    logger.info('Captured[{:04d}]'.format(i))
+
+                # The replay and loading icons only need a look every few frames
+                if i % check_every != 0:
+                    continue
+
+                with self.metrics.span('player_check'):
+                    if self.is_replay_shown():
+                        break
+
+                    if self.is_loading_shown():
+                        logger.info('Loading Timer is shown')
+                        loading_timer += check_every
+                    else:
+                        loading_timer = 0
+
+                if loading_timer > 20:
+                    logger.error('Ugh Maybe Never End')
+                    raise RpaJRAVideoPlayObserveTimeout
+        finally:
+            self.write_capture_index(pic_dir, capture_index)
+
+        elapsed = monotonic() - start
+        logger.info('Video End : {} frames, {:.2f} frames/sec'.format(
+            len(capture_index), len(capture_index) / elapsed if elapsed > 0 else 0.0))
+
+    def write_capture_index(self, pic_dir, capture_index):
+        # With a lap schedule the timer was already read online, RpaJRAVideoReadTime
+        # can take the readings from here instead of running the OCR again
+        with_readings = self.is_lap_schedule_active()
+
+        with open(os.path.join(pic_dir, self.CAPTURE_INDEX_FILE_NAME), 'w') as wfp:
+            wfp.write('frame,file,captured{}\n'.format(',time,ts,additional' if with_readings else ''))
+            for i, filename, captured in capture_index:
+                line = '{},{},{:.6f}'.format(i, filename, captured)
+                if with_readings:
+                    reading = self.lap_schedule.get_reading(i)
+                    if reading is not None:
+                        line += ',{},{},{:d}'.format(reading[0], reading[1], reading[2])
+                    else:
+                        line += ',,,'
+                wfp.write(line + '\n')
+
+    def capture_video(self):
+        if self.capture_interval is None and self.is_lap_schedule_active() == False:
+            self.capture_video_aqap()
+        else:
+            self.capture_video_scheduled()
+
     def play_jra_video(self):
-        self.invoke_jra_video()
+        with self.metrics.span('invoke_jra_video'):
+            self.invoke_jra_video()
 
-        self.safty_wait()
+        self.wait_for('movie_window', lambda browser: len(browser.window_handles) > 1, self.safty_wait)
 
         handles = self.browser.window_handles
 
@@ -227,7 +450,8 @@ class RpaJRAVideo(object):
 
         for i in range(3):
             try :
-                WebDriverWait(self.browser, 5).until(EC.presence_of_element_located((By.TAG_NAME, 'iframe')))
+                WebDriverWait(self.browser, 5, poll_frequency=self.WAIT_POLL_INTERVAL).until(
+                    EC.presence_of_element_located((By.TAG_NAME, 'iframe')))
                 logger.debug('iframe comes up')
                 iframe = self.browser.find_elements_by_tag_name('iframe')
                 if len(iframe) >= 1:
@@ -236,20 +460,27 @@ class RpaJRAVideo(object):
                     break
                 else:
                     logger.info("No iframe")
-                    sleep(1)
+                    self.metrics.incr('iframe_retries')
+                    if self.EVENT_DRIVEN_WAITS == False:
+                        sleep(1)
             except exceptions.TimeoutException:
                 logger.info('exceptions.TimeoutException happens, retry')
+                self.metrics.incr('iframe_retries')
         else:
             self.browser.close()
             self.browser.switch_to_window(handles[0])
             raise RpaJRAVideoPlayTimeout
 
-        self.safty_long_wait()
+        self.wait_for('player', lambda browser: is_document_ready(browser) and
+                      browser.find_element_by_class_name('eq-icon-resolution').is_displayed(),
+                      self.safty_long_wait)
 
-        self.set_high_quality()
+        with self.metrics.span('set_high_quality'):
+            self.set_high_quality()
 
         try:
-            self.wait_until_video_plays()
+            with self.metrics.span('wait_until_video_plays'):
+                self.wait_until_video_plays()
         except RpaJRAVideoPlayTimeout:
             self.browser.close()
             self.browser.switch_to_window(handles[0])
@@ -257,60 +488,132 @@ class RpaJRAVideo(object):
 
 
 
+    def acquire_driver(self):
+        if self.session_pool is not None:
+            return self.session_pool.acquire()
+
+        return self.get_driver()
+
+    def release_driver(self, failed=False):
+        if self.browser is None:
+            return
+
+        if self.session_pool is not None:
+            self.session_pool.release(self.browser, failed=failed)
+        else:
+            self.browser.quit()
+
+        self.browser = None
+
     def automated_screen_shot(self):
-        self.browser = self.get_driver()
+        with self.metrics.span('acquire_driver'):
+            self.browser = self.acquire_driver()
 
         for i in range(5):
-            self.browser.get('file:////{}'.format(FILE_PATH))
-            self.safty_wait()
+            self.browser.get('file:////{}'.format(self.landing_page_path))
+            self.wait_for('landing_page', lambda browser: browser.find_elements_by_id('btn'), self.safty_wait)
             try :
-                self.invoke_jra_result()
+                with self.metrics.span('invoke_jra_result'):
+                    self.invoke_jra_result()
                 break
             except RpaJRAVideoPlayContentError:
                 logger.info('Retry to load JRA Result')
+                self.metrics.incr('result_retries')
         else:
             logger.error('Failed to play video')
             self.browser.close()
             self.browser.switch_to_window(self.browser.window_handles[0])
-            self.browser.quit()
+            self.release_driver(failed=True)
             raise RpaJRAVideoPlayFail
 
-        self.safty_wait()
+        self.wait_for('result_page', lambda browser: len(browser.find_elements_by_id('btn')) == 0 and
+                      is_document_ready(browser), self.safty_wait, timeout=5)
 
         for i in range(5):
             try :
-                self.play_jra_video()
+                with self.metrics.span('play_jra_video'):
+                    self.play_jra_video()
                 break
             except RpaJRAVideoPlayTimeout:
                 logger.info('Retry Play Video [{}]'.format(i))
+                self.metrics.incr('play_retries')
             except RpaJRAVideoPlayContentError:
                 logger.info('Retry Play Video [{}]'.format(i))
+                self.metrics.incr('play_retries')
         else:
             logger.error('Failed to play video')
             self.browser.close()
             self.browser.switch_to_window(self.browser.window_handles[0])
-            self.browser.quit()
+            self.release_driver(failed=True)
             raise RpaJRAVideoPlayFail
 
         try :
-            self.capture_video_aqap()
+            with self.metrics.span('capture_video'):
+                self.capture_video()
         except RpaJRAVideoPlayObserveTimeout:
             self.browser.close()
             self.browser.switch_to_window(self.browser.window_handles[0])
-            self.browser.quit()
+            self.release_driver(failed=True)
             logger.info('Retry Play Video [{}]'.format(i))
             raise RpaJRAVideoPlayFail
 
         self.browser.close()
         self.browser.switch_to_window(self.browser.window_handles[0])
-        self.browser.quit()
+        self.release_driver()
 
 
-    def start_automated_process(self, race_id):
+    def start_automated_process(self, race_id, laps=None):
         self.gen_landing_page(race_id)
         self.gen_pic_dir(race_id)
 
-        self.automated_screen_shot()
+        if self.roi_capture is not None:
+            self.roi_capture.start(self.pic_dir)
+
+        if self.ocr_pipeline is not None:
+            self.ocr_pipeline.start(race_id)
+
+        if self.finish_detector is not None:
+            self.finish_detector.start(race_id)
+
+        if self.lap_schedule is not None:
+            self.lap_schedule.start(race_id, laps)
+
+        if self.screen_shot_writer is not None and self.roi_capture is None:
+            self.screen_shot_writer.start(self.metrics)
+
+        self.metrics.reset()
+        try:
+            with self.metrics.span('race'):
+                self.automated_screen_shot()
+        finally:
+            # Only left over when the flow raised something unexpected
+            self.release_driver(failed=True)
+
+            if self.roi_capture is not None:
+                self.roi_capture.finish()
+
+            if self.screen_shot_writer is not None:
+                with self.metrics.span('screenshot_writer_drain'):
+                    self.screen_shot_writer.finish()
+
+            if self.ocr_pipeline is not None:
+                with self.metrics.span('ocr_pipeline_drain'):
+                    self.time_stamps = self.ocr_pipeline.finish()
+
+            self.write_metrics(race_id)
+
+    def write_metrics(self, race_id):
+        if self.metrics.enabled == False:
+            return
+
+        summary = self.metrics.get_summary()
+        logger.info('Metrics : {}'.format(json.dumps(summary, sort_keys=True)))
+
+        if os.path.isdir(self.pic_dir):
+            self.metrics.write_json(os.path.join(self.pic_dir, 'metrics.json'), race_id=race_id)
+
+        if self.metrics.prometheus_path is not None:
+            self.metrics.write_prometheus(race_id=race_id)
 
 
 class RpaJRAVideoFireFox(RpaJRAVideo):
@@ -318,6 +621,19 @@ class RpaJRAVideoFireFox(RpaJRAVideo):
         return webdriver.Firefox()
 
 
+class RpaJRAVideoFireFoxHeadless(RpaJRAVideo):
+    WINDOW_WIDTH = 1366
+    WINDOW_HEIGHT = 768
+
+    def get_driver(self):
+        options = webdriver.FirefoxOptions()
+        options.headless = True
+        browser = webdriver.Firefox(options=options)
+        browser.set_window_size(self.WINDOW_WIDTH, self.WINDOW_HEIGHT)
+
+        return browser
+
+
 
 
 
@@ -0,0 +1,73 @@
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def compute_histogram(img, channel=2, scale=None):
+    if scale is not None:
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    return np.bincount(img[:, :, channel].ravel(), minlength=256)
+
+
+def compute_histograms(files, channel=2, scale=None):
+    histgs = np.empty((len(files), 256), dtype=np.float32)
+
+    for i, file in enumerate(files):
+        histgs[i] = compute_histogram(cv2.imread(file, 1), channel, scale)
+
+    return histgs
+
+
+def neighbour_correlations(histgs):
+    # cv2.HISTCMP_CORREL between every frame and the next one, for all frames at once
+    histgs = np.asarray(histgs, dtype=np.float64)
+    centered = histgs - histgs.mean(axis=1, keepdims=True)
+    norms = np.sqrt(np.einsum('ij,ij->i', centered, centered))
+    numerators = np.einsum('ij,ij->i', centered[1:], centered[:-1])
+    denominators = norms[1:] * norms[:-1]
+
+    correls = np.ones(len(numerators))
+    valid = denominators > 0
+    correls[valid] = numerators[valid] / denominators[valid]
+
+    return correls
+
+
+class SceneChangeDetector(object):
+    def __init__(self, files, histgs):
+        self.files = list(files)
+        self.histgs = np.asarray(histgs, dtype=np.float32)
+        self.correls = neighbour_correlations(self.histgs)
+
+    @classmethod
+    def from_files(cls, files, channel=2, scale=None):
+        return cls(files, compute_histograms(files, channel, scale))
+
+    def find_cuts(self, threashold=0.8):
+        # Index of the first frame of every new scene
+        return np.flatnonzero(self.correls < threashold) + 1
+
+    def find_scene_start(self, start, end, threashold=0.8, backward=True):
+        # Same rule as RpaJRAVideoReadTime.find_scene_start on files[start:end], scanning
+        # from the last frame when backward, otherwise from the first one
+        start = max(start, 0)
+        end = min(end, len(self.files))
+        correls = self.correls[start:end - 1]
+
+        if len(correls) == 0:
+            return self.files[end - 1 if backward else start]
+
+        below = np.flatnonzero(correls < threashold)
+        if backward:
+            if len(below):
+                return self.files[start + below[-1] + 1]
+            lowest = len(correls) - 1 - np.argmin(correls[::-1])
+            return self.files[start + lowest + 1]
+
+        if len(below):
+            return self.files[start + below[0]]
+        return self.files[start + np.argmin(correls)]
@@ -0,0 +1,155 @@
+import os
+import time
+import shutil
+import sqlite3
+import logging
+import threading
+
+from k2kvideo import rpa
+from k2kvideo.session import RpaJRAVideoSessionPool
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class RpaJRAVideoJobQueue(object):
+    # One connection per thread; SQLite serialises the claims between workers
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.local = threading.local()
+
+        with self.connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS jobs ('
+                         ' race_id TEXT PRIMARY KEY,'
+                         ' status TEXT NOT NULL,'
+                         ' attempts INTEGER NOT NULL DEFAULT 0,'
+                         ' worker TEXT,'
+                         ' error TEXT,'
+                         ' updated REAL)')
+
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self.local.conn = conn
+
+        return Transaction(conn)
+
+    def add(self, race_ids):
+        with self.connect() as conn:
+            conn.executemany('INSERT OR IGNORE INTO jobs (race_id, status, updated) VALUES (?, ?, ?)',
+                             [(race_id, STATUS_PENDING, time.time()) for race_id in race_ids])
+
+    def recover(self):
+        # Jobs left running by a crashed process go back to the queue
+        with self.connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, updated = ? WHERE status = ?',
+                         (STATUS_PENDING, time.time(), STATUS_RUNNING))
+
+    def claim(self, worker):
+        with self.connect() as conn:
+            row = conn.execute('SELECT race_id FROM jobs WHERE status = ? ORDER BY rowid LIMIT 1',
+                               (STATUS_PENDING,)).fetchone()
+            if row is None:
+                return None
+
+            conn.execute('UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, updated = ?'
+                         ' WHERE race_id = ?', (STATUS_RUNNING, worker, time.time(), row[0]))
+
+        return row[0]
+
+    def complete(self, race_id):
+        with self.connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, error = NULL, updated = ? WHERE race_id = ?',
+                         (STATUS_DONE, time.time(), race_id))
+
+    def fail(self, race_id, error):
+        with self.connect() as conn:
+            conn.execute('UPDATE jobs SET status = CASE WHEN attempts < ? THEN ? ELSE ? END,'
+                         ' error = ?, updated = ? WHERE race_id = ?',
+                         (self.max_attempts, STATUS_PENDING, STATUS_FAILED, error, time.time(), race_id))
+
+    def get_counts(self):
+        with self.connect() as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+
+class Transaction(object):
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.conn.execute('ROLLBACK' if exc_type is not None else 'COMMIT')
+
+
+class RpaJRAVideoCaptureScheduler(object):
+    def __init__(self, queue_path, workers=2, max_attempts=3, pic_root='./pic',
+                 rpa_class=rpa.RpaJRAVideoFireFoxHeadless, max_uses=20):
+        self.queue = RpaJRAVideoJobQueue(queue_path, max_attempts)
+        self.workers = workers
+        self.pic_root = pic_root
+        self.rpa_class = rpa_class
+        self.max_uses = max_uses
+
+    def get_worker_paths(self, k):
+        landing_page_path = '/tmp/k2kvideo_landing_page_{}.html'.format(k)
+        pic_dir_path = '{}/worker{}/{{}}'.format(self.pic_root, k)
+
+        return landing_page_path, pic_dir_path
+
+    def run(self, race_ids):
+        self.queue.add(race_ids)
+        self.queue.recover()
+        logger.info('Jobs : {}'.format(self.queue.get_counts()))
+
+        threads = [threading.Thread(target=self.work, args=(k,), name='capture-{}'.format(k))
+                   for k in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        counts = self.queue.get_counts()
+        logger.info('Jobs : {}'.format(counts))
+
+        return counts
+
+    def work(self, k):
+        landing_page_path, pic_dir_path = self.get_worker_paths(k)
+        rpa_ins = self.rpa_class(landing_page_path=landing_page_path, pic_dir_path=pic_dir_path)
+        rpa_ins.session_pool = RpaJRAVideoSessionPool(rpa_ins.get_driver, max_uses=self.max_uses,
+                                                      landing_page=landing_page_path)
+
+        try:
+            while True:
+                race_id = self.queue.claim('worker{}'.format(k))
+                if race_id is None:
+                    break
+
+                logger.info('[worker{}] Race ID : {}'.format(k, race_id))
+                try:
+                    rpa_ins.start_automated_process(race_id)
+                    self.publish(rpa_ins.get_pic_dir_path(), race_id)
+                    self.queue.complete(race_id)
+                except Exception as e:
+                    logger.warning('[worker{}] {} failed : {!r}'.format(k, race_id, e))
+                    self.queue.fail(race_id, repr(e))
+        finally:
+            rpa_ins.session_pool.close()
+
+    def publish(self, worker_pic_dir, race_id):
+        # Only complete captures show up where RpaJRAVideoReadTime looks for them
+        pic_dir = '{}/{}'.format(self.pic_root, race_id.replace('/', '-'))
+        if os.path.isdir(pic_dir):
+            shutil.rmtree(pic_dir)
+
+        os.replace(worker_pic_dir, pic_dir)
@@ -0,0 +1,100 @@
+import queue
+import logging
+import threading
+
+from selenium.common import exceptions
+
+from k2kvideo import rpa
+
+logger = logging.getLogger(__name__)
+
+
+class RpaJRAVideoSessionPool(object):
+    # Keeps browsers alive across races; a driver is recycled after a failure or max_uses races
+    def __init__(self, factory, size=1, max_uses=20, landing_page=None):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.landing_page = landing_page or rpa.FILE_PATH
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.uses = {}
+        self.created = 0
+        self.recycled = 0
+
+    def acquire(self):
+        while True:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self.lock:
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+
+            if create:
+                break
+
+            # Wake up now and then; a session discarded by another thread frees a slot
+            try:
+                return self.idle.get(timeout=1.0)
+            except queue.Empty:
+                pass
+
+        try:
+            driver = self.factory()
+        except Exception:
+            with self.lock:
+                self.created -= 1
+            raise
+
+        self.uses[id(driver)] = 0
+        logger.info('Browser session started [{}/{}]'.format(self.created, self.size))
+
+        return driver
+
+    def release(self, driver, failed=False):
+        self.uses[id(driver)] = self.uses.get(id(driver), 0) + 1
+
+        if failed == False and self.uses[id(driver)] < self.max_uses:
+            try:
+                self.reset(driver)
+                self.idle.put(driver)
+                return
+            except exceptions.WebDriverException as e:
+                logger.info('Failed to reset browser session : {}'.format(e))
+
+        self.discard(driver)
+
+    def reset(self, driver):
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to_window(handle)
+            driver.close()
+
+        driver.switch_to_window(handles[0])
+        driver.switch_to.default_content()
+        driver.get('file:////{}'.format(self.landing_page))
+
+    def discard(self, driver):
+        self.uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except exceptions.WebDriverException as e:
+            logger.info('Failed to quit browser session : {}'.format(e))
+
+        with self.lock:
+            self.created -= 1
+            self.recycled += 1
+
+        logger.info('Browser session recycled')
+
+    def close(self):
+        while True:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(driver)
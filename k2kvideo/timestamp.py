@@ -0,0 +1,279 @@
+import os
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMPTY = np.zeros(0, dtype=np.int64)
+
+
+def get_thresholds(laps):
+    # The first snap shot is the first frame the timer shows 1 sec, then one per cumulative lap
+    elapsed_time = np.cumsum(np.asarray(laps, dtype=np.int64))
+    return np.concatenate([[1], elapsed_time // 10])
+
+
+def force_increasing(indices):
+    # indices[k] = max(indices[k], indices[k - 1] + 1)
+    steps = np.arange(len(indices))
+    return np.maximum.accumulate(indices - steps) + steps
+
+
+def pick_in_order(ts, found, thresholds):
+    # Same answers as scanning for each threshold from just after the previous snap shot.
+    # found[k] is the first frame of the whole race reaching thresholds[k]; it is only
+    # wrong when it is not after the previous pick, e.g. an earlier misread frame
+    # already showed a larger second, and then the rest of the race is scanned
+    picks = []
+    start = 0
+    for index, threshold in zip(found, thresholds):
+        index = int(index)
+        if index < start:
+            later = np.flatnonzero(ts[start:] >= threshold)
+            index = start + int(later[0]) if len(later) else len(ts)
+
+        if index < len(ts):
+            picks.append(index)
+            start = index + 1
+
+    return np.array(picks, dtype=np.int64)
+
+
+class TimestampIndex(object):
+    # Columnar time stamps of one race: every column is a NumPy array and slicing a
+    # range of frames shares them; files are kept as a table of directories plus names
+    __slots__ = ('frames', 'ts', 'additional', 'captured', 'times', 'paths', 'path_ids', 'names', '_sorted_ts')
+
+    def __init__(self, ts, files, times=None, additional=None, captured=None, frames=None):
+        self.ts = np.asarray(ts, dtype=np.int64)
+        count = len(self.ts)
+
+        # A file without a directory, e.g. a frame of a video in the working directory,
+        # keeps an empty path
+        dirs, names = zip(*[os.path.split(file) for file in files]) if count else ((), ())
+        self.paths, path_ids = np.unique(np.array(dirs, dtype=str), return_inverse=True)
+        self.path_ids = path_ids.astype(np.int32)
+        self.names = np.array(names, dtype=str)
+
+        self.frames = np.asarray(frames, dtype=np.int64) if frames is not None else np.arange(count)
+        self.times = np.array(times if times is not None else [''] * count, dtype=str)
+        if additional is not None:
+            self.additional = np.asarray(additional, dtype=bool)
+        else:
+            self.additional = np.zeros(count, dtype=bool)
+        if captured is not None:
+            self.captured = np.array([np.nan if value is None else value for value in captured], dtype=np.float64)
+        else:
+            self.captured = np.full(count, np.nan)
+
+        self._sorted_ts = None
+
+    @classmethod
+    def from_columns(cls, frames, ts, additional, captured, times, paths, path_ids, names):
+        index = cls.__new__(cls)
+        index.frames = frames
+        index.ts = ts
+        index.additional = additional
+        index.captured = captured
+        index.times = times
+        index.paths = paths
+        index.path_ids = path_ids
+        index.names = names
+        index._sorted_ts = None
+
+        return index
+
+    @classmethod
+    def from_time_stamps(cls, time_stamps):
+        frames = None
+        if len(time_stamps) and 'frame' in time_stamps[0]:
+            frames = [time_stamp['frame'] for time_stamp in time_stamps]
+
+        return cls([time_stamp['ts'] for time_stamp in time_stamps],
+                   [time_stamp['file'] for time_stamp in time_stamps],
+                   [time_stamp['time'] for time_stamp in time_stamps],
+                   [time_stamp.get('additional', False) for time_stamp in time_stamps],
+                   [time_stamp.get('captured') for time_stamp in time_stamps],
+                   frames)
+
+    def get_columns(self):
+        return {
+            'frames': self.frames,
+            'ts': self.ts,
+            'additional': self.additional,
+            'captured': self.captured,
+            'times': self.times,
+            'paths': self.paths,
+            'path_ids': self.path_ids,
+            'names': self.names
+        }
+
+    @property
+    def sorted_ts(self):
+        # The race timer counts up; the running maximum keeps searchsorted valid
+        # and still yields the first frame reaching each second
+        if self._sorted_ts is None:
+            self._sorted_ts = np.maximum.accumulate(self.ts) if len(self.ts) else self.ts
+
+        return self._sorted_ts
+
+    @property
+    def files(self):
+        return [self.get_file(index) for index in range(len(self))]
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            columns = self.get_columns()
+            for name in ('frames', 'ts', 'additional', 'captured', 'times', 'path_ids', 'names'):
+                columns[name] = columns[name][key]
+            return TimestampIndex.from_columns(**columns)
+
+        return self.get_time_stamp(key)
+
+    def get_file(self, index):
+        return os.path.join(self.paths[self.path_ids[index]], self.names[index])
+
+    def get_time_stamp(self, index):
+        time_stamp = {
+            'file': self.get_file(index),
+            'ts': int(self.ts[index]),
+            'time': str(self.times[index])
+        }
+
+        if self.additional[index]:
+            time_stamp['additional'] = True
+
+        if np.isnan(self.captured[index]) == False:
+            time_stamp['captured'] = float(self.captured[index])
+
+        return time_stamp
+
+    def to_time_stamps(self):
+        return [self.get_time_stamp(index) for index in range(len(self))]
+
+    def save_npz(self, filename):
+        np.savez(filename, **self.get_columns())
+
+    @classmethod
+    def load_npz(cls, filename):
+        with np.load(filename) as npz:
+            return cls.from_columns(**dict((name, npz[name]) for name in npz.files))
+
+    def save_jsonl(self, filename):
+        with open(filename, 'w') as wfp:
+            for index in range(len(self)):
+                time_stamp = self.get_time_stamp(index)
+                time_stamp['frame'] = int(self.frames[index])
+                wfp.write(json.dumps(time_stamp) + '\n')
+
+    @classmethod
+    def load_jsonl(cls, filename):
+        with open(filename, 'r') as rfp:
+            return cls.from_time_stamps([json.loads(line) for line in rfp if line.strip()])
+
+    def save(self, filename):
+        if filename.endswith('.npz'):
+            self.save_npz(filename)
+        else:
+            self.save_jsonl(filename)
+
+    @classmethod
+    def load(cls, filename):
+        if filename.endswith('.npz'):
+            return cls.load_npz(filename)
+
+        return cls.load_jsonl(filename)
+
+    def search(self, thresholds):
+        return pick_in_order(self.ts, np.searchsorted(self.sorted_ts, thresholds, side='left'), thresholds)
+
+    def find_snap_shop(self, laps):
+        return [self.get_time_stamp(index) for index in self.search(get_thresholds(laps))]
+
+    def has_capture_times(self):
+        return len(self) > 1 and np.isnan(self.captured).any() == False
+
+    def get_timer_ticks(self):
+        # The timer ticks from ts - 1 to ts somewhere between two captures, the midpoint
+        # of the two captures is when it showed ts. A tick only counts when the frames
+        # around it agree, which leaves out ticks between misread frames
+        ts = self.ts.astype(np.int64)
+        k = np.arange(1, len(ts))
+        earlier = ts[k - 1] - ts[np.maximum(k - 2, 0)]
+        later = ts[np.minimum(k + 1, len(ts) - 1)] - ts[k]
+        ticks = k[(ts[k] == ts[k - 1] + 1) & (earlier >= 0) & (earlier <= 1) & (later >= 0) & (later <= 1)]
+
+        # np.interp wants increasing seconds
+        seconds = ts[ticks]
+        keep = seconds > np.concatenate([[-1], np.maximum.accumulate(seconds)[:-1]])
+        ticks = ticks[keep]
+
+        captured = np.maximum.accumulate(self.captured)
+        return ts[ticks].astype(np.float64), (captured[ticks - 1] + captured[ticks]) / 2
+
+    def get_capture_targets(self, seconds):
+        # Capture time at which the timer showed each of seconds, interpolated between
+        # the ticks on either side so a loading stall only moves the laps across it;
+        # before the first and after the last tick the timer runs at real time
+        ticks, midpoints = self.get_timer_ticks()
+        if len(ticks) == 0:
+            return None
+
+        seconds = np.asarray(seconds, dtype=np.float64)
+        targets = np.interp(seconds, ticks, midpoints)
+        targets = np.where(seconds < ticks[0], midpoints[0] + seconds - ticks[0], targets)
+        return np.where(seconds > ticks[-1], midpoints[-1] + seconds - ticks[-1], targets)
+
+    def search_captured(self, targets):
+        # Targets after the last capture were never captured, they are dropped rather
+        # than all landing on the last frame
+        captured = np.maximum.accumulate(self.captured)
+        targets = np.asarray(targets)
+        targets = targets[targets <= captured[-1]]
+        after = np.searchsorted(captured, targets, side='left')
+        before = np.maximum(after - 1, 0)
+        nearer = np.where(np.abs(captured[before] - targets) <= np.abs(captured[after] - targets), before, after)
+        indices = force_increasing(nearer)
+
+        return indices[indices < len(self)]
+
+    def find_snap_shop_interpolated(self, laps):
+        # Laps are in 1/10 sec; with capture times the snap shot is the frame captured
+        # nearest the lap boundary rather than the first frame showing its whole second
+        elapsed_time = np.cumsum(np.asarray(laps, dtype=np.float64)) / 10
+        targets = self.get_capture_targets(np.concatenate([[1.0], elapsed_time])) if self.has_capture_times() else None
+        if targets is None:
+            logger.info('No capture times, falling back to whole seconds')
+            return self.find_snap_shop(laps)
+
+        return [self.get_time_stamp(index) for index in self.search_captured(targets)]
+
+
+def find_snap_shop_many(indexes, laps_list):
+    # Answer every race of a race day with a single searchsorted over the concatenated
+    # indexes, each race shifted into its own key range
+    span = 1
+    for index, laps in zip(indexes, laps_list):
+        if len(index):
+            span = max(span, int(index.sorted_ts[-1]) + 1)
+        span = max(span, int(get_thresholds(laps)[-1]) + 1)
+
+    keys = np.concatenate([index.sorted_ts + i * span for i, index in enumerate(indexes)] + [EMPTY])
+    thresholds = [get_thresholds(laps) for laps in laps_list]
+    groups = np.repeat(np.arange(len(thresholds)), [len(threshold) for threshold in thresholds])
+    targets = np.concatenate([threshold + i * span for i, threshold in enumerate(thresholds)] + [EMPTY])
+
+    starts = np.cumsum([0] + [len(index) for index in indexes])
+    found = np.searchsorted(keys, targets, side='left').astype(np.int64) - starts[groups]
+
+    outputs = []
+    for group, (index, threshold) in enumerate(zip(indexes, thresholds)):
+        picks = pick_in_order(index.ts, found[groups == group], threshold)
+        outputs.append([index.get_time_stamp(pick) for pick in picks])
+
+    return outputs
@@ -0,0 +1,115 @@
+import time
+import logging
+
+import cv2
+import numpy as np
+
+from k2kvideo.ocr import RpaJRAVideoReadTime
+from k2kvideo.model import NumpyLinearClassifier, get_grid_pixels
+
+logger = logging.getLogger(__name__)
+
+
+def gen_digit_dataset(races, max_frames=None):
+    # Digit cells of captured races, labelled by the current model; identical cells are kept once
+    cells = []
+    groups = []
+    labels = []
+
+    for k, race in enumerate(races):
+        ocr = RpaJRAVideoReadTime(race['id'], rcw=race.get('rcw', False))
+
+        store = ocr.get_frame_store()
+        if store is not None:
+            digits = [ocr.crop_digits(roi) for roi in store[:max_frames]]
+        else:
+            files = ocr.get_files()[:max_frames]
+            if len(files) == 0:
+                logger.warning('No frames for {}'.format(race['id']))
+                continue
+            digits = [ocr.crop_digits(ocr.crop_roi(cv2.imread(file, 1))) for file in files]
+
+        if len(digits) == 0:
+            continue
+
+        digits = np.unique(np.concatenate(digits), axis=0)
+        cells.append(digits)
+        groups.append(np.full(len(digits), k))
+        labels.append(ocr.clf.predict(digits))
+        logger.info('{} : {} distinct digit cells'.format(race['id'], len(digits)))
+
+    if len(cells) == 0:
+        raise ValueError('No digit cells found')
+
+    return np.concatenate(cells), np.concatenate(labels), np.concatenate(groups)
+
+
+def split_dataset(groups, holdout=0.2):
+    # Whole races are held out when there are several, otherwise every n-th cell
+    races = np.unique(groups)
+    if len(races) > 1:
+        count = max(1, int(round(len(races) * holdout)))
+        test = np.isin(groups, races[-count:])
+    else:
+        test = np.arange(len(groups)) % int(round(1 / holdout)) == 0
+
+    return ~test, test
+
+
+def train_model(X, y, shape, step=(2, 2), components=None, C=1.0):
+    from sklearn.svm import LinearSVC
+
+    features = np.take(X, get_grid_pixels(shape, step), axis=1) / 255
+
+    pca = None
+    if components is not None:
+        from sklearn.decomposition import PCA
+        pca = PCA(n_components=components, random_state=0).fit(features)
+        features = pca.transform(features)
+
+    svc = LinearSVC(C=C, max_iter=10000).fit(features, y)
+    coef = svc.coef_
+    intercept = svc.intercept_
+    if len(svc.classes_) == 2:
+        coef = np.vstack([-coef, coef])
+        intercept = np.concatenate([-intercept, intercept])
+
+    # Both the PCA projection and the 1/255 scaling are linear, fold them into the weights
+    # so predict stays a single matrix product on the grid pixels
+    if pca is not None:
+        intercept = intercept - np.dot(np.dot(coef, pca.components_), pca.mean_)
+        coef = np.dot(coef, pca.components_)
+    coef = coef / 255
+
+    return NumpyLinearClassifier(coef, intercept, svc.classes_, shape, step)
+
+
+def measure_throughput(clf, X, repeat=5, batch_size=4):
+    # Cells per second, predicting batch_size cells per call like read_from_file does
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        for j in range(0, len(X), batch_size):
+            clf.predict(X[j:j + batch_size])
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return len(X) / best if best > 0 else 0.0
+
+
+def evaluate(reference, candidate, X, y=None, repeat=5, bench_size=4096):
+    expected = reference.predict(X) if y is None else y
+    actual = candidate.predict(X)
+
+    # Throughput on a fixed number of cells however small the held out set is
+    bench = X[np.arange(max(len(X), bench_size)) % len(X)] if len(X) else X
+
+    return {
+        'samples': len(X),
+        'features': int(candidate.coef_.shape[1]),
+        'agreement': float(np.mean(expected == actual)) if len(X) else 0.0,
+        'reference_cells_per_sec': measure_throughput(reference, bench, repeat),
+        'candidate_cells_per_sec': measure_throughput(candidate, bench, repeat),
+        'reference_batch_cells_per_sec': measure_throughput(reference, bench, repeat, len(bench)),
+        'candidate_batch_cells_per_sec': measure_throughput(candidate, bench, repeat, len(bench))
+    }
@@ -0,0 +1,88 @@
+import logging
+from collections import deque
+
+import cv2
+import numpy as np
+
+from k2kvideo.scene import SceneChangeDetector
+
+logger = logging.getLogger(__name__)
+
+
+def find_cut(entries, threashold=0.8):
+    # Same rule as RpaJRAVideoReadTime.find_scene_start, over (index, histg) pairs in scan order
+    indices = [index for index, histg in entries]
+    histgs = [histg.ravel() for index, histg in entries]
+
+    return SceneChangeDetector(indices, histgs).find_scene_start(0, len(indices), threashold, backward=False)
+
+
+class RpaJRAVideoTrimmer(object):
+    SCENE_WINDOW = 20
+
+    def __init__(self, ocr, threashold=0.8, load=None, stores=None):
+        self.ocr = ocr
+        self.threashold = threashold
+        self.load = load or (lambda files, index: cv2.imread(files[index], 1))
+        # (roi, thumb) FrameStoreReaders of a race captured with RpaJRAVideoRoiCapture
+        self.stores = stores
+        self.frames = {}
+        self.decoded = 0
+
+    def read(self, files, index):
+        # Digits and the red channel histogram come from the same decoded buffer
+        if index not in self.frames:
+            if self.stores is not None:
+                roi_store, thumb_store = self.stores
+                result = self.ocr.read_from_rois(roi_store[index:index + 1])[0]
+                histg = cv2.calcHist([np.ascontiguousarray(thumb_store[index])], [2], None, [256], [0, 256])
+            else:
+                img = self.load(files, index)
+                result = self.ocr.read_from_image(img)
+                histg = cv2.calcHist([img], [2], None, [256], [0, 256])
+            self.frames[index] = (result, histg)
+            self.decoded += 1
+
+        return self.frames[index]
+
+    def find_start(self, files):
+        recent = deque(maxlen=self.SCENE_WINDOW)
+
+        for i in range(len(files)):
+            (timestamp, timestamp_ss, is_additional_digit), histg = self.read(files, i)
+            if timestamp_ss >= 1:
+                if len(recent) == 0:
+                    return i
+                return find_cut(list(reversed(recent)), self.threashold)
+
+            recent.append((i, histg))
+
+        return None
+
+    def find_end(self, files, start):
+        recent = deque(maxlen=self.SCENE_WINDOW)
+
+        for i in range(len(files) - 1, start - 1, -1):
+            (timestamp, timestamp_ss, is_additional_digit), histg = self.read(files, i)
+            if is_additional_digit == False:
+                if len(recent) == 0:
+                    return i
+                return find_cut(list(reversed(recent)), self.threashold)
+
+            recent.append((i, histg))
+
+        return len(files) - 1
+
+    def get_trimed_list(self, files):
+        self.frames = {}
+        self.decoded = 0
+
+        start = self.find_start(files)
+        if start is None:
+            logger.info('Timer never starts')
+            return []
+
+        end = self.find_end(files, start)
+        logger.debug('Trimmed [{}:{}], {} / {} frames decoded'.format(start, end, self.decoded, len(files)))
+
+        return files[start:end + 1]
@@ -0,0 +1,109 @@
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Screen size the ROI coordinates of RpaJRAVideoReadTime refer to, see RpaJRAVideoFireFoxHeadless
+REFERENCE_WIDTH = 1366
+REFERENCE_HEIGHT = 768
+
+
+class RpaJRAVideoFileReader(object):
+    # A race recording read like a FrameStoreReader: one sample every interval sec of video,
+    # only the timer strip of each sample is kept for the OCR
+    GRAB_LIMIT = 30
+
+    def __init__(self, filename, roi, interval=0.5):
+        self.filename = filename
+        self.roi = roi
+
+        self.capture = cv2.VideoCapture(filename)
+        if self.capture.isOpened() == False:
+            raise IOError('Cannot open {}'.format(filename))
+
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.position = 0
+
+        step = max(1, int(round(self.fps * interval)))
+        self.frame = np.arange(0, self.frame_count, step)
+        self.captured = self.frame / self.fps
+
+        logger.info('{} : {}x{}, {:.2f} fps, {} frames, {} samples'.format(
+            filename, self.width, self.height, self.fps, self.frame_count, len(self.frame)))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return np.array([self.read_roi(index) for index in range(*key.indices(len(self)))])
+
+        return self.read_roi(key)
+
+    def get_names(self):
+        return ['{}:{:06d}'.format(self.filename, frame) for frame in self.frame]
+
+    def read_frame(self, index):
+        frame = int(self.frame[index])
+
+        # Short gaps are cheaper to decode through than to seek over, a seek restarts
+        # decoding at the previous key frame
+        if frame < self.position or frame - self.position > self.GRAB_LIMIT:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, frame)
+            self.position = frame
+        while self.position < frame:
+            self.capture.grab()
+            self.position += 1
+
+        ret, img = self.capture.read()
+        self.position += 1
+        if ret == False:
+            raise IOError('Cannot read frame {} of {}'.format(frame, self.filename))
+
+        return img
+
+    def read_roi(self, index):
+        img = self.read_frame(index)
+        top, bottom, left, right = self.roi
+
+        if img.shape[1] == REFERENCE_WIDTH and img.shape[0] == REFERENCE_HEIGHT:
+            return img[top:bottom, left:right].copy()
+
+        # Other resolutions: crop the scaled strip and bring only that to the reference size
+        sx = img.shape[1] / REFERENCE_WIDTH
+        sy = img.shape[0] / REFERENCE_HEIGHT
+        roi = img[int(top * sy):int(round(bottom * sy)), int(left * sx):int(round(right * sx))]
+
+        return cv2.resize(roi, (right - left, bottom - top), interpolation=cv2.INTER_AREA)
+
+    def load(self, files, index):
+        # Whole frame at the reference size, for RpaJRAVideoTrimmer
+        img = self.read_frame(index)
+        if img.shape[1] != REFERENCE_WIDTH or img.shape[0] != REFERENCE_HEIGHT:
+            img = cv2.resize(img, (REFERENCE_WIDTH, REFERENCE_HEIGHT), interpolation=cv2.INTER_AREA)
+
+        return img
+
+    def close(self):
+        self.capture.release()
+
+
+def write_video(files, filename, fps=2.0, fourcc='mp4v'):
+    # Builds a recording out of captured screenshots, one screenshot per frame
+    writer = None
+    for file in files:
+        img = cv2.imread(file, 1)
+        if writer is None:
+            writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*fourcc), fps,
+                                     (img.shape[1], img.shape[0]))
+        writer.write(img)
+
+    if writer is not None:
+        writer.release()
+
+    return len(files)
@@ -0,0 +1,131 @@
+import os
+import time
+import queue
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RpaJRAVideoScreenShotWriter(object):
+    # The capture loop only fetches the PNG bytes; writing (and re-encoding) happens on
+    # worker threads. A full queue blocks the capture loop so memory stays bounded
+    def __init__(self, workers=2, max_queue=16, compression=None, metrics=None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.compression = compression
+        self.metrics = metrics
+        self.threads = []
+
+    def start(self, metrics=None):
+        if metrics is not None:
+            self.metrics = metrics
+
+        self.queue = queue.Queue(maxsize=self.max_queue)
+        self.lock = threading.Lock()
+        self.error = None
+        self.puts = 0
+        self.written = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self.blocked = 0
+        self.write_total = 0.0
+        self.write_max = 0.0
+
+        self.threads = [threading.Thread(target=self.run, name='png-writer-{}'.format(k))
+                        for k in range(self.workers)]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def put(self, filename, png):
+        if self.error is not None:
+            raise self.error
+
+        depth = self.queue.qsize()
+        with self.lock:
+            self.puts += 1
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+
+        try:
+            self.queue.put_nowait((filename, png))
+        except queue.Full:
+            self.blocked += 1
+            if self.metrics is not None:
+                self.metrics.incr('writer_backpressure')
+                with self.metrics.span('writer_blocked'):
+                    self.queue.put((filename, png))
+            else:
+                self.queue.put((filename, png))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            if self.error is not None:
+                continue
+
+            start = time.perf_counter()
+            try:
+                self.write(*item)
+            except Exception as e:
+                logger.error(e)
+                self.error = e
+                continue
+
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.written += 1
+                self.write_total += elapsed
+                self.write_max = max(self.write_max, elapsed)
+            if self.metrics is not None:
+                self.metrics.observe('screenshot_write', elapsed)
+
+    def write(self, filename, png):
+        if self.compression is not None:
+            img = cv2.imdecode(np.frombuffer(png, dtype=np.uint8), cv2.IMREAD_COLOR)
+            ret, buf = cv2.imencode('.png', img, [cv2.IMWRITE_PNG_COMPRESSION, self.compression])
+            png = buf.tobytes()
+
+        # Readers glob for *.png, so a half written file must never carry that name
+        tmp_path = '{}.tmp'.format(filename)
+        with open(tmp_path, 'wb') as wfp:
+            wfp.write(png)
+        os.replace(tmp_path, filename)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'written': self.written,
+                'blocked': self.blocked,
+                'queue_depth_max': self.depth_max,
+                'queue_depth_mean': self.depth_total / self.puts if self.puts else 0.0,
+                'write_mean': self.write_total / self.written if self.written else 0.0,
+                'write_max': self.write_max
+            }
+
+    def finish(self, timeout=None):
+        if len(self.threads) == 0:
+            return None
+
+        for thread in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.error('Screenshot writer did not drain in time')
+        self.threads = []
+
+        stats = self.get_stats()
+        logger.info('Screenshot writer : {}'.format(stats))
+
+        if self.error is not None:
+            raise self.error
+
+        return stats
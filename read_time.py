@@ -18,7 +18,7 @@ if __name__ == '__main__':
     ]
 
     for race in races:
-        ocr = ocr.RpaJRAVideoReadTime(race['id'], rcw=True)
+        ocr = ocr.RpaJRAVideoReadTime(race['id'], rcw=True, use_cache=True)
         output = ocr.find_snap_shop(race['laps'])
 
         for time_stamp in output:
@@ -0,0 +1,48 @@
+import glob
+import time
+import argparse
+import logging
+import logging.config
+
+from k2kvideo import ocr
+from k2kvideo import video
+
+
+logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Find the lap snap shots in a race recording')
+    parser.add_argument('video')
+    parser.add_argument('--laps', default='123,109,113,112,115,113,115,119', help='Laps in 1/10 sec')
+    parser.add_argument('--rcw', action='store_true')
+    parser.add_argument('--lazy', action='store_true')
+    parser.add_argument('--trim', action='store_true')
+    parser.add_argument('--from-race', default=None,
+                        help='First write the captured frames of this race as the video, at 2 fps')
+    args = parser.parse_args()
+
+    if args.from_race is not None:
+        pic_dir = '{}/{}'.format(ocr.RpaJRAVideoReadTime.PIC_DIRE_PATH, args.from_race.replace('/', '-'))
+        count = video.write_video(sorted(glob.glob('{}/test_*.png'.format(pic_dir))), args.video,
+                                  fps=1 / ocr.RpaJRAVideoReadTime.VIDEO_INTERVAL)
+        logger.info('Wrote {} frames to {}'.format(count, args.video))
+
+    laps = [int(lap) for lap in args.laps.split(',')]
+    ocr_ins = ocr.RpaJRAVideoReadTime(args.video, rcw=args.rcw, video_path=args.video)
+    duration = ocr_ins.video.frame_count / ocr_ins.video.fps
+
+    start = time.perf_counter()
+    output = ocr_ins.find_snap_shop(laps, lazy=args.lazy)
+    elapsed = time.perf_counter() - start
+    logger.info('{:.1f} sec of video in {:.2f} sec, x{:.1f} real time'.format(duration, elapsed, duration / elapsed))
+
+    for time_stamp in output:
+        logger.info('ts : {} ({})'.format(time_stamp['ts'], time_stamp['time']))
+        logger.info(' file : {}'.format(time_stamp['file']))
+
+    if args.trim:
+        trimed = ocr_ins.get_trimed_list()
+        if trimed:
+            logger.info('Trimmed : {} - {} ({} samples)'.format(trimed[0], trimed[-1], len(trimed)))
@@ -1,6 +1,7 @@
 import logging
 
 from k2kvideo import rpa
+from k2kvideo import session
 
 
 logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
@@ -85,7 +86,8 @@ if __name__ == '__main__':
 
 
 
-    rpa_ins = rpa.RpaJRAVideoFireFox()
+    session_pool = session.RpaJRAVideoSessionPool(rpa.RpaJRAVideoFireFox().get_driver)
+    rpa_ins = rpa.RpaJRAVideoFireFox(session_pool=session_pool)
 
     for race in races:
         for i in range(2):
@@ -96,5 +98,7 @@ if __name__ == '__main__':
             except rpa.RpaJRAVideoPlayFail:
                 logger.warning('RpaJRAVideoPlayFail')
 
+    session_pool.close()
+
 
 
@@ -0,0 +1,25 @@
+import argparse
+import logging
+import logging.config
+
+from k2kvideo import scheduler
+
+
+logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Capture races with parallel headless browsers')
+    parser.add_argument('races', help='Text file with one race id per line')
+    parser.add_argument('--queue', default='./k2kvideo_jobs.sqlite3')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-attempts', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.races, 'r') as rfp:
+        races = [line.strip() for line in rfp if line.strip() and line.startswith('#') == False]
+
+    scheduler_ins = scheduler.RpaJRAVideoCaptureScheduler(args.queue, workers=args.workers,
+                                                          max_attempts=args.max_attempts)
+    scheduler_ins.run(races)
@@ -0,0 +1,85 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from k2kvideo.ocr import RpaJRAVideoReadTime
+
+# Timer seconds of the generated race: every second on two frames, then the finishing
+# time with its 1/10 sec digit. The race scene starts a few frames before the timer and
+# the result scene a few frames before the end, inside the windows the trimmer searches
+RACE_SECONDS = [0] * 6 + [sec for sec in range(1, 41) for i in range(2)] + [40] * 6
+FINISH_FRAMES = 6
+SCENE_FRAMES = 3
+SCENE_COLORS = [(40, 40, 40), (120, 150, 60), (200, 200, 200)]
+
+
+def find_digit_cell(clf, k):
+    # Walk a grey cell towards the weights of class k until the model is sure about it
+    cell = np.full(clf.coef_.shape[1], 128.0)
+    for i in range(2000):
+        scores = np.dot(cell, clf.coef_.T) + clf.intercept_
+        others = scores.copy()
+        others[k] = -np.inf
+        j = others.argmax()
+        if scores[k] - scores[j] > 5:
+            break
+        cell = np.clip(cell + 20 * np.sign(clf.coef_[k] - clf.coef_[j]), 0, 255)
+
+    return cell.astype(np.uint8)
+
+
+@pytest.fixture(scope='session')
+def digit_cells():
+    ocr = RpaJRAVideoReadTime('cells')
+    cells = dict((str(c), find_digit_cell(ocr.clf, k)) for k, c in enumerate(ocr.clf.classes_))
+    for c, cell in cells.items():
+        assert ocr.clf.predict(cell[None])[0] == c
+
+    return dict((c, cell.reshape((ocr.UNIT_HIGHT, ocr.UNIT_WIDTH))) for c, cell in cells.items())
+
+
+def make_frame(cells, sec, additional=False, rcw=True, scene=1):
+    # A gradient keeps the scene histograms from being a single spike
+    shade = np.linspace(0.5, 1.0, 1366)[None, :, None]
+    img = (np.array(SCENE_COLORS[scene]) * shade * np.ones((768, 1, 1))).astype(np.uint8)
+
+    labels = ['5' if additional else 'o', str(sec % 10) if sec else 'o',
+              str(sec % 60 // 10) if sec >= 10 else 'o', str(sec // 60) if sec >= 60 else 'o']
+    roi = np.zeros((RpaJRAVideoReadTime.UNIT_HIGHT, 135), np.uint8)
+    for label, offset in zip(labels, [0, 37, 63, 100]):
+        roi[:, 108 - offset:134 - offset] = cells[label]
+
+    seg = RpaJRAVideoReadTime.TIME_SEG
+    left = seg['left'] + (RpaJRAVideoReadTime.TIME_SEG_RCW_OFFSET if rcw else 0)
+    img[seg['top']:seg['bottom'], left:left + 135] = cv2.cvtColor(roi, cv2.COLOR_GRAY2BGR)
+
+    return img
+
+
+def make_race_frames(cells, rcw=True):
+    count = len(RACE_SECONDS)
+    scenes = [0 if i < SCENE_FRAMES else 2 if i >= count - SCENE_FRAMES else 1 for i in range(count)]
+
+    return [make_frame(cells, sec, i >= count - FINISH_FRAMES, rcw, scene)
+            for i, (sec, scene) in enumerate(zip(RACE_SECONDS, scenes))]
+
+
+@pytest.fixture
+def pic_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(RpaJRAVideoReadTime, 'PIC_DIRE_PATH', str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def png_race(pic_root, digit_cells):
+    pic_dir = pic_root / 'race'
+    pic_dir.mkdir()
+    for i, img in enumerate(make_race_frames(digit_cells)):
+        cv2.imwrite(str(pic_dir / 'test_{:04d}.png'.format(i)), img)
+
+    return 'race'
@@ -0,0 +1,90 @@
+import os
+import shutil
+
+import cv2
+
+from k2kvideo import model
+from k2kvideo.cache import RpaJRAVideoReadTimeCache
+from k2kvideo.ocr import RpaJRAVideoReadTime
+
+
+class CountingClassifier(object):
+    def __init__(self, clf):
+        self.clf = clf
+        self.cells = 0
+
+    def predict(self, X):
+        self.cells += len(X)
+        return self.clf.predict(X)
+
+
+def count_imread(monkeypatch):
+    calls = []
+    imread = cv2.imread
+
+    def counting_imread(filename, *args):
+        calls.append(filename)
+        return imread(filename, *args)
+
+    monkeypatch.setattr(cv2, 'imread', counting_imread)
+    return calls
+
+
+def read_cached(race_id, batch_size=None):
+    ocr = RpaJRAVideoReadTime(race_id, rcw=True, use_cache=True)
+    ocr.clf = CountingClassifier(ocr.clf)
+    return ocr, ocr.read_time(batch_size)
+
+
+def test_warm_cache_skips_decode_and_predict(monkeypatch, pic_root, png_race):
+    expected = RpaJRAVideoReadTime(png_race, rcw=True).read_time()
+    ocr, time_stamps = read_cached(png_race)
+    assert time_stamps == expected
+    assert os.path.isfile(str(pic_root / png_race / RpaJRAVideoReadTimeCache.INDEX_FILE_NAME))
+
+    calls = count_imread(monkeypatch)
+    for batch_size in (None, 16):
+        ocr, time_stamps = read_cached(png_race, batch_size)
+        assert time_stamps == expected
+        assert ocr.clf.cells == 0
+        assert ocr.cache.misses == 0
+    assert calls == []
+
+
+def test_touched_frame_is_read_again(monkeypatch, pic_root, png_race):
+    read_cached(png_race)
+
+    # The 10th frame now shows what the 50th one does
+    pic_dir = pic_root / png_race
+    shutil.copyfile(str(pic_dir / 'test_0050.png'), str(pic_dir / 'test_0010.png'))
+    stat = os.stat(str(pic_dir / 'test_0010.png'))
+    os.utime(str(pic_dir / 'test_0010.png'), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    calls = count_imread(monkeypatch)
+    ocr, time_stamps = read_cached(png_race, 16)
+
+    assert calls == [str(pic_dir / 'test_0010.png')]
+    assert ocr.cache.misses == 1
+    assert time_stamps[10]['ts'] == time_stamps[50]['ts'] != time_stamps[9]['ts']
+
+
+def test_other_model_invalidates_the_cache(monkeypatch, tmp_path, pic_root, png_race):
+    read_cached(png_race)
+
+    # Same weights in another file with a slightly different intercept
+    clf = model.load_model(model.get_asset_path(model.NUMPY_MODEL_FILE_NAME))
+    other = model.NumpyLinearClassifier(clf.coef_, clf.intercept_ + 1e-6, clf.classes_)
+    other_path = str(tmp_path / 'other_model.npz')
+    other.save(other_path)
+    monkeypatch.setattr(RpaJRAVideoReadTime, 'MODEL_NAME', other_path)
+
+    calls = count_imread(monkeypatch)
+    ocr, time_stamps = read_cached(png_race)
+
+    assert len(calls) == len(time_stamps)
+    assert ocr.cache.hits == 0
+
+    # The cache now belongs to the other model
+    calls[:] = []
+    read_cached(png_race)
+    assert calls == []
@@ -0,0 +1,73 @@
+import numpy as np
+
+from k2kvideo.digits import DigitChangeDetector
+from k2kvideo.ocr import RpaJRAVideoReadTime
+
+
+class CountingClassifier(object):
+    def __init__(self, clf):
+        self.clf = clf
+        self.cells = 0
+
+    def predict(self, X):
+        self.cells += len(X)
+        return self.clf.predict(X)
+
+
+def make_cells(digit_cells, labels):
+    return np.array([digit_cells[label].ravel() for label in labels])
+
+
+def fade(digit_cells, start, end, steps=100):
+    # Every step changes the cell by less than the tolerance, the whole fade by far more
+    frames = []
+    for step in range(steps + 1):
+        cell = digit_cells[start] * (1 - step / steps) + digit_cells[end] * (step / steps)
+        frames.append(np.vstack([make_cells(digit_cells, 'ooo'), cell.astype(np.uint8).ravel()[None]]))
+
+    return frames
+
+
+def test_slow_fade_is_predicted_again(digit_cells):
+    clf = RpaJRAVideoReadTime('digits').clf
+    frames = fade(digit_cells, '3', '8')
+    step_diffs = [np.abs(b[3].astype(int) - a[3]).mean() for a, b in zip(frames, frames[1:])]
+    assert max(step_diffs) < 2.0
+    assert np.abs(frames[-1][3].astype(int) - frames[0][3]).mean() > 2.0
+
+    # One frame per call, like read_from_file, and the whole fade in one call
+    detector = DigitChangeDetector()
+    predicts = [detector.predict(clf, frame) for frame in frames]
+    assert predicts[0][3] == '3'
+    assert predicts[-1][3] == '8'
+
+    batched = DigitChangeDetector().predict(clf, np.concatenate(frames)).reshape((-1, 4))
+    assert [list(p) for p in batched] == [list(p) for p in predicts]
+
+
+def test_unchanged_cells_reuse_predictions(digit_cells):
+    clf = CountingClassifier(RpaJRAVideoReadTime('digits').clf)
+    labels = ['o1oo', 'o1oo', 'o1oo', 'o2oo', 'o2oo', '52oo']
+    frames = [make_cells(digit_cells, label) for label in labels]
+
+    detector = DigitChangeDetector()
+    predicts = [''.join(detector.predict(clf, frame)) for frame in frames[:3]]
+    predicts.extend(''.join(p) for p in detector.predict(clf, np.concatenate(frames[3:])).reshape((-1, 4)))
+
+    assert predicts == labels
+    # The first frame and then one changed cell each in the 4th and the 6th frame
+    assert clf.cells == 6
+    assert detector.get_skip_ratio() == 1 - 6 / 24
+
+    detector.reset()
+    assert ''.join(detector.predict(clf, frames[0])) == labels[0]
+    assert clf.cells == 10
+
+
+def test_read_time_skipping_unchanged_cells(png_race):
+    expected = RpaJRAVideoReadTime(png_race, rcw=True).read_time()
+    ocr = RpaJRAVideoReadTime(png_race, rcw=True, skip_unchanged=True)
+
+    assert ocr.read_time() == expected
+    assert ocr.read_time(batch_size=16) == expected
+    assert ocr.change_detector.get_skip_ratio() > 0.5
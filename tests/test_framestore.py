@@ -0,0 +1,56 @@
+import glob
+import shutil
+
+from k2kvideo import framestore
+from k2kvideo.ocr import RpaJRAVideoReadTime
+
+LAPS = [123, 109, 113]
+
+
+def get_frame_numbers(files):
+    return [int(file[-4:]) if file.endswith(tuple('0123456789')) else int(file[-8:-4]) for file in files]
+
+
+def convert_copy(pic_root, race_id, store_id):
+    shutil.copytree(str(pic_root / race_id), str(pic_root / store_id))
+    framestore.convert_png_dir(str(pic_root / store_id), rcw=True, remove_png=True)
+    assert glob.glob(str(pic_root / store_id / '*.png')) == []
+
+
+def test_store_reads_like_png(pic_root, png_race):
+    convert_copy(pic_root, png_race, 'store')
+
+    png = RpaJRAVideoReadTime(png_race, rcw=True)
+    store = RpaJRAVideoReadTime('store', rcw=True)
+
+    assert [t['ts'] for t in store.read_time()] == [t['ts'] for t in png.read_time()]
+    for lazy in (False, True):
+        assert get_frame_numbers(t['file'] for t in store.find_snap_shop(LAPS, lazy=lazy)) == \
+            get_frame_numbers(t['file'] for t in png.find_snap_shop(LAPS, lazy=lazy))
+
+
+def test_store_trims_like_png(pic_root, png_race):
+    convert_copy(pic_root, png_race, 'store')
+
+    expected = get_frame_numbers(RpaJRAVideoReadTime(png_race, rcw=True).get_trimed_list(single_pass=True))
+    assert len(expected) > 0
+
+    for single_pass in (False, True):
+        trimed = RpaJRAVideoReadTime('store', rcw=True).get_trimed_list(single_pass=single_pass)
+        assert get_frame_numbers(trimed) == expected
+
+
+def test_missing_race_trims_to_nothing(pic_root):
+    assert RpaJRAVideoReadTime('missing').get_trimed_list() == []
+
+
+def test_store_is_read_before_png(pic_root, png_race):
+    expected = [t['ts'] for t in RpaJRAVideoReadTime(png_race, rcw=True).read_time()]
+    framestore.convert_png_dir(str(pic_root / png_race), rcw=True)
+
+    ocr = RpaJRAVideoReadTime(png_race, rcw=True)
+    time_stamps = ocr.read_time()
+    assert all('.bin:' in t['file'] for t in time_stamps)
+    assert [t['ts'] for t in time_stamps] == expected
+    assert all('.bin:' in t['file'] for t in ocr.find_snap_shop(LAPS, lazy=True))
+    assert all('.bin:' in file for file in ocr.get_trimed_list())
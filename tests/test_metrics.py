@@ -0,0 +1,31 @@
+from k2kvideo.metrics import Metrics
+
+
+def test_merge_keeps_counts_totals_and_max():
+    races = [Metrics(), Metrics()]
+    for elapsed in (0.1, 0.9, 0.2):
+        races[0].observe('screenshot', elapsed)
+    races[1].observe('screenshot', 0.3)
+    races[1].observe('player_check', 0.05)
+    races[0].incr('late_frames', 2)
+    races[1].incr('late_frames')
+
+    total = Metrics()
+    for race in races:
+        total.merge(race.get_summary())
+    summary = total.get_summary()
+
+    assert summary['spans']['screenshot']['count'] == 4
+    assert abs(summary['spans']['screenshot']['total'] - 1.5) < 1e-9
+    assert summary['spans']['screenshot']['max'] == 0.9
+    assert summary['spans']['player_check'] == {'count': 1, 'total': 0.05, 'max': 0.05}
+    assert summary['counters'] == {'late_frames': 3}
+
+
+def test_disabled_metrics_ignore_merge():
+    race = Metrics()
+    race.observe('screenshot', 0.1)
+
+    total = Metrics(enabled=False)
+    total.merge(race.get_summary())
+    assert total.get_summary() == {'spans': {}, 'counters': {}}
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from k2kvideo import model
+
+
+def test_numpy_model_matches_joblib_model():
+    pytest.importorskip('sklearn')
+
+    reference = model.load_joblib(model.get_asset_path(model.MODEL_FILE_NAME))
+    exported = model.load_model(model.get_asset_path(model.NUMPY_MODEL_FILE_NAME))
+
+    cells = np.random.RandomState(0).randint(0, 256, (2000, exported.coef_.shape[1])).astype(np.uint8)
+
+    assert list(exported.classes_) == list(reference.classes_)
+    assert np.array_equal(exported.predict(cells), reference.predict(cells))
+
+
+def test_mmap_model_matches_loaded_model():
+    filename = model.get_asset_path(model.NUMPY_MODEL_FILE_NAME)
+    loaded = model.load_model(filename)
+    mapped = model.load_model(filename, mmap=True)
+
+    cells = np.random.RandomState(1).randint(0, 256, (200, loaded.coef_.shape[1])).astype(np.uint8)
+
+    assert np.array_equal(loaded.predict(cells), mapped.predict(cells))
+
+
+def test_missing_named_model_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert model.find_model_file() == model.get_asset_path(model.NUMPY_MODEL_FILE_NAME)
+    assert model.find_model_file(model.MODEL_FILE_NAME) == model.get_asset_path(model.MODEL_FILE_NAME)
+    with pytest.raises(IOError):
+        model.find_model_file('missing_model.npz')
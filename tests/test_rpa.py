@@ -0,0 +1,45 @@
+from time import sleep
+
+import pytest
+
+pytest.importorskip('selenium')
+
+from k2kvideo.metrics import Metrics
+from k2kvideo.rpa import RpaJRAVideo
+
+
+class StalledCapture(RpaJRAVideo):
+    # One screenshot takes stall sec, every other one is instant
+    def __init__(self, pic_dir, stall_at, stall, frames, **kwargs):
+        super(StalledCapture, self).__init__(metrics=Metrics(), check_every=1, **kwargs)
+        self.pic_dir = pic_dir
+        self.stall_at = stall_at
+        self.stall = stall
+        self.frames = frames
+        self.captured = []
+
+    def save_screen_shot(self, pic_dir, i, captured=None):
+        self.captured.append(captured)
+        if i == self.stall_at:
+            sleep(self.stall)
+        return '{}/test_{:04d}.png'.format(pic_dir, i)
+
+    def is_finish_captured(self, i):
+        return i + 1 >= self.frames
+
+    def is_replay_shown(self):
+        return False
+
+    def is_loading_shown(self):
+        return False
+
+
+def test_missed_frames_are_skipped_after_a_stall(tmp_path):
+    rpa = StalledCapture(str(tmp_path), stall_at=3, stall=1.0, frames=15, capture_interval=0.1)
+    rpa.capture_video_scheduled()
+
+    gaps = [b - a for a, b in zip(rpa.captured, rpa.captured[1:])]
+    assert gaps[3] >= 1.0
+    assert min(gaps) > 0.05
+    assert rpa.metrics.counters['late_frames'] >= 8
+    assert (tmp_path / RpaJRAVideo.CAPTURE_INDEX_FILE_NAME).exists()
@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+
+from k2kvideo.scene import SceneChangeDetector, neighbour_correlations
+from k2kvideo.trim import find_cut
+
+
+def find_cut_compare_hist(entries, threashold=0.8):
+    # The per-pair cv2.compareHist loop of RpaJRAVideoReadTime.find_scene_start
+    lowest = 100.0
+    candidate = entries[0][0]
+
+    for i in range(1, len(entries)):
+        histg_diff = cv2.compareHist(entries[i][1], entries[i - 1][1], cv2.HISTCMP_CORREL)
+        if histg_diff < threashold:
+            return entries[i - 1][0]
+        elif lowest > histg_diff:
+            lowest = histg_diff
+            candidate = entries[i - 1][0]
+
+    return candidate
+
+
+def make_histgs(count, seed=0):
+    random = np.random.RandomState(seed)
+    scenes = random.randint(0, 3, count)
+    base = random.rand(3, 256).astype(np.float32) * 1000
+    return (base[scenes] + random.rand(count, 256).astype(np.float32) * 200).reshape((count, 256, 1))
+
+
+def test_neighbour_correlations_match_compare_hist():
+    histgs = make_histgs(50)
+    expected = [cv2.compareHist(histgs[i + 1], histgs[i], cv2.HISTCMP_CORREL) for i in range(len(histgs) - 1)]
+
+    assert np.allclose(neighbour_correlations(histgs.reshape((-1, 256))), expected)
+
+
+def test_find_cut_matches_compare_hist_loop():
+    for seed in range(30):
+        histgs = make_histgs(1 + seed % 21, seed)
+        entries = [(100 - i, histg) for i, histg in enumerate(histgs)]
+        for threashold in (0.5, 0.8, 0.95, 0.999):
+            assert find_cut(entries, threashold) == find_cut_compare_hist(entries, threashold)
+
+
+def test_find_cuts_any_threshold():
+    histgs = make_histgs(40).reshape((-1, 256))
+    detector = SceneChangeDetector(range(40), histgs)
+
+    for threashold in (0.5, 0.8, 0.95):
+        expected = [i for i in range(1, 40)
+                    if cv2.compareHist(histgs[i], histgs[i - 1], cv2.HISTCMP_CORREL) < threashold]
+        assert list(detector.find_cuts(threashold)) == expected
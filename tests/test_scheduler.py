@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip('selenium')
+
+from k2kvideo import scheduler
+from k2kvideo.scheduler import RpaJRAVideoJobQueue
+
+
+def get_job(queue, race_id):
+    conn = sqlite3.connect(queue.path)
+    try:
+        return conn.execute('SELECT status, attempts, worker, error FROM jobs WHERE race_id = ?',
+                            (race_id,)).fetchone()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return RpaJRAVideoJobQueue(str(tmp_path / 'jobs.sqlite'), max_attempts=2)
+
+
+def test_claim_in_the_order_added(queue):
+    queue.add(['2019/1', '2019/3', '2019/2'])
+    queue.add(['2019/1', '2019/4'])
+
+    assert [queue.claim('worker0') for i in range(5)] == ['2019/1', '2019/3', '2019/2', '2019/4', None]
+    assert get_job(queue, '2019/3')[:3] == (scheduler.STATUS_RUNNING, 1, 'worker0')
+
+
+def test_failed_job_is_retried_up_to_max_attempts(queue):
+    queue.add(['2019/1', '2019/2'])
+
+    assert queue.claim('worker0') == '2019/1'
+    queue.fail('2019/1', 'TimeoutError()')
+    assert get_job(queue, '2019/1') == (scheduler.STATUS_PENDING, 1, 'worker0', 'TimeoutError()')
+
+    # Back in the queue before the jobs added after it
+    assert queue.claim('worker1') == '2019/1'
+    queue.fail('2019/1', 'RpaJRAVideoPlayTimeout()')
+    assert get_job(queue, '2019/1') == (scheduler.STATUS_FAILED, 2, 'worker1', 'RpaJRAVideoPlayTimeout()')
+
+    assert queue.claim('worker0') == '2019/2'
+    assert queue.claim('worker0') is None
+    assert queue.get_counts() == {scheduler.STATUS_FAILED: 1, scheduler.STATUS_RUNNING: 1}
+
+
+def test_recover_requeues_running_jobs(queue):
+    queue.add(['2019/1', '2019/2', '2019/3'])
+    queue.claim('worker0')
+    queue.claim('worker1')
+    queue.complete('2019/2')
+
+    # A new process opening the same queue after a crash
+    restarted = RpaJRAVideoJobQueue(queue.path, max_attempts=2)
+    restarted.recover()
+
+    assert restarted.get_counts() == {scheduler.STATUS_PENDING: 2, scheduler.STATUS_DONE: 1}
+    assert restarted.claim('worker0') == '2019/1'
+    assert get_job(restarted, '2019/1')[1] == 2
+
+
+def test_add_does_not_requeue_finished_jobs(queue):
+    queue.add(['2019/1', '2019/2'])
+    assert queue.claim('worker0') == '2019/1'
+    queue.complete('2019/1')
+    queue.fail(queue.claim('worker0'), 'error')
+    queue.fail(queue.claim('worker0'), 'error')
+
+    queue.add(['2019/1', '2019/2', '2019/3'])
+
+    assert get_job(queue, '2019/1')[:2] == (scheduler.STATUS_DONE, 1)
+    assert get_job(queue, '2019/2')[:2] == (scheduler.STATUS_FAILED, 2)
+    assert queue.claim('worker0') == '2019/3'
+    assert queue.claim('worker0') is None
@@ -0,0 +1,126 @@
+import pytest
+
+pytest.importorskip('selenium')
+
+from selenium.common import exceptions
+
+from k2kvideo.session import RpaJRAVideoSessionPool
+
+
+class FakeSwitchTo(object):
+    def __init__(self, driver):
+        self.driver = driver
+
+    def default_content(self):
+        self.driver.calls.append('default_content')
+
+
+class FakeDriver(object):
+    # Just enough of a WebDriver for the pool: windows, navigation and quit
+    def __init__(self, windows=1, broken=False):
+        self.window_handles = ['window{}'.format(i) for i in range(windows)]
+        self.current = self.window_handles[0]
+        self.switch_to = FakeSwitchTo(self)
+        self.broken = broken
+        self.calls = []
+        self.url = None
+        self.quitted = False
+
+    def switch_to_window(self, handle):
+        if self.broken:
+            raise exceptions.WebDriverException('browser is gone')
+        self.current = handle
+
+    def close(self):
+        self.window_handles.remove(self.current)
+        self.calls.append('close')
+
+    def get(self, url):
+        self.url = url
+
+    def quit(self):
+        if self.broken:
+            raise exceptions.WebDriverException('browser is gone')
+        self.quitted = True
+
+
+class FakeFactory(object):
+    def __init__(self):
+        self.drivers = []
+
+    def __call__(self):
+        self.drivers.append(FakeDriver())
+        return self.drivers[-1]
+
+
+def test_released_session_is_reset_and_reused():
+    factory = FakeFactory()
+    pool = RpaJRAVideoSessionPool(factory, max_uses=3, landing_page='/tmp/landing.html')
+
+    driver = pool.acquire()
+    driver.window_handles.extend(['movie', 'popup'])
+    driver.current = 'popup'
+    pool.release(driver)
+
+    assert driver.window_handles == ['window0']
+    assert driver.current == 'window0'
+    assert driver.calls == ['close', 'close', 'default_content']
+    assert driver.url == 'file:////{}'.format('/tmp/landing.html')
+    assert driver.quitted == False
+
+    assert pool.acquire() is driver
+    assert len(factory.drivers) == 1
+
+
+def test_session_is_recycled_after_max_uses():
+    factory = FakeFactory()
+    pool = RpaJRAVideoSessionPool(factory, max_uses=2)
+
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.release(first)
+
+    assert first.quitted
+    assert pool.recycled == 1
+    second = pool.acquire()
+    assert second is not first
+    assert len(factory.drivers) == 2
+
+
+def test_failed_session_is_discarded():
+    factory = FakeFactory()
+    pool = RpaJRAVideoSessionPool(factory, max_uses=20)
+
+    driver = pool.acquire()
+    pool.release(driver, failed=True)
+
+    assert driver.quitted
+    assert (pool.created, pool.recycled) == (0, 1)
+    assert pool.acquire() is not driver
+
+
+def test_session_that_cannot_be_reset_is_discarded():
+    broken = FakeDriver(windows=2, broken=True)
+    pool = RpaJRAVideoSessionPool(lambda: broken, max_uses=20)
+
+    assert pool.acquire() is broken
+    pool.release(broken)
+
+    # quit fails as well, the slot is still given back
+    assert broken.quitted == False
+    assert (pool.created, pool.recycled) == (0, 1)
+    assert pool.idle.empty()
+
+
+def test_close_quits_idle_sessions():
+    factory = FakeFactory()
+    pool = RpaJRAVideoSessionPool(factory, size=2)
+
+    drivers = [pool.acquire(), pool.acquire()]
+    for driver in drivers:
+        pool.release(driver)
+    pool.close()
+
+    assert all(driver.quitted for driver in drivers)
+    assert (pool.created, pool.recycled) == (0, 2)
@@ -0,0 +1,127 @@
+import numpy as np
+
+from k2kvideo.timestamp import TimestampIndex, find_snap_shop_many
+
+
+def find_snap_shop_rescan(ts, laps):
+    # The original del-and-rescan loop of RpaJRAVideoReadTime.find_snap_shop
+    remaining = list(enumerate(ts))
+    output = []
+
+    thresholds = [1]
+    elapsed_time = 0
+    for lap in laps:
+        elapsed_time += lap
+        thresholds.append(int(elapsed_time / 10))
+
+    for threshold in thresholds:
+        for i in range(len(remaining)):
+            if remaining[i][1] >= threshold:
+                output.append(remaining[i][0])
+                del remaining[:i + 1]
+                break
+
+    return output
+
+
+def make_index(ts, captured=None):
+    return TimestampIndex(ts, ['./pic/race/test_{:04d}.png'.format(i) for i in range(len(ts))], captured=captured)
+
+
+def make_stalled_race(stall_at=10.0, stall=5.0, count=120, interval=0.5):
+    # A capture every interval sec; the player stalls for stall sec when the timer shows stall_at
+    captured = 0.2 + interval * np.arange(count)
+    timer = np.where(captured < stall_at, captured, np.maximum(captured - stall, stall_at))
+    to_captured = lambda second: second if second < stall_at else second + stall
+
+    return make_index(np.floor(timer).astype(int), captured), to_captured
+
+
+def get_frames(time_stamps):
+    return [int(time_stamp['file'][-8:-4]) for time_stamp in time_stamps]
+
+
+def test_misread_frame_does_not_shift_later_snap_shots():
+    ts = [i // 2 for i in range(120)]
+    ts[30] = 55
+    laps = [123, 109, 113]
+
+    assert find_snap_shop_rescan(ts, laps) == [2, 24, 30, 68]
+    assert get_frames(make_index(ts).find_snap_shop(laps)) == [2, 24, 30, 68]
+
+
+def test_matches_rescan_loop_with_random_misreads():
+    random = np.random.RandomState(0)
+    for trial in range(200):
+        count = random.randint(0, 150)
+        ts = np.arange(count) // random.randint(1, 4)
+        for i in random.randint(0, max(count, 1), random.randint(0, 4)):
+            if i < count:
+                ts[i] = random.randint(0, 90)
+        laps = list(random.randint(3, 150, random.randint(1, 9)))
+
+        expected = find_snap_shop_rescan(list(ts), laps)
+        assert get_frames(make_index(ts).find_snap_shop(laps)) == expected
+        assert get_frames(find_snap_shop_many([make_index(ts)], [laps])[0]) == expected
+
+
+def test_find_snap_shop_many_matches_single_races():
+    ts_list = [[i // 2 for i in range(100)], [], [i for i in range(40)]]
+    ts_list[0][10] = 70
+    laps_list = [[123, 109], [100], [95, 100, 500]]
+
+    indexes = [make_index(ts) for ts in ts_list]
+    outputs = find_snap_shop_many(indexes, laps_list)
+
+    for index, laps, output in zip(indexes, laps_list, outputs):
+        assert output == index.find_snap_shop(laps)
+
+
+def test_interpolated_snap_shots_across_a_stall():
+    laps = [123, 109, 113]
+    index, to_captured = make_stalled_race()
+    seconds = [1.0] + list(np.cumsum(laps) / 10)
+
+    output = index.find_snap_shop_interpolated(laps)
+    assert len(output) == len(seconds)
+    for second, time_stamp in zip(seconds, output):
+        assert abs(time_stamp['captured'] - to_captured(second)) <= 0.5
+
+    # The stall does not move the snap shots before it either way round
+    index, to_captured = make_stalled_race(stall_at=40.0)
+    for second, time_stamp in zip(seconds, index.find_snap_shop_interpolated(laps)):
+        assert abs(time_stamp['captured'] - to_captured(second)) <= 0.5
+
+
+def test_interpolated_snap_shots_after_the_last_capture_are_dropped():
+    index, to_captured = make_stalled_race()
+    output = index.find_snap_shop_interpolated([123, 109, 500, 500])
+
+    assert len(output) == 3
+    assert len(set(time_stamp['file'] for time_stamp in output)) == 3
+
+
+def test_interpolated_snap_shots_ignore_misread_ticks():
+    index, to_captured = make_stalled_race(stall=0.0)
+    index.ts[30] = 55
+    index.ts[31] = 56
+
+    for second, time_stamp in zip([1.0, 12.3, 23.2], index.find_snap_shop_interpolated([123, 109])):
+        assert abs(time_stamp['captured'] - to_captured(second)) <= 0.5
+
+
+def test_files_round_trip_through_save_and_load(tmp_path):
+    time_stamps = [
+        {'file': 'race.mp4:000000', 'ts': 0, 'time': ''},
+        {'file': 'race.mp4:000015', 'ts': 1, 'time': '0:01', 'captured': 0.5},
+        {'file': './pic/race/test_0002.png', 'ts': 2, 'time': '0:02'},
+        {'file': '/tmp/pic/race/roi.bin:0003', 'ts': 3, 'time': '0:03.5', 'additional': True}
+    ]
+    index = TimestampIndex.from_time_stamps(time_stamps)
+    assert index.to_time_stamps() == time_stamps
+
+    for filename in ('time_stamps.npz', 'time_stamps.jsonl'):
+        index.save(str(tmp_path / filename))
+        loaded = TimestampIndex.load(str(tmp_path / filename))
+        assert loaded.to_time_stamps() == time_stamps
+        assert all(type(time_stamp['file']) is str for time_stamp in loaded.to_time_stamps())
@@ -0,0 +1,59 @@
+import cv2
+import pytest
+
+from k2kvideo import video
+from k2kvideo.ocr import RpaJRAVideoReadTime
+
+from conftest import make_race_frames
+
+LAPS = [123, 109, 113]
+
+
+def get_frame_numbers(files):
+    return [int(file.rpartition(':')[2]) if '.png' not in file else int(file[-8:-4]) for file in files]
+
+
+@pytest.fixture(scope='module')
+def race_frames(digit_cells):
+    return make_race_frames(digit_cells)
+
+
+def write_race_video(filename, frames, fps, size):
+    # Every captured frame is held for fps / 2 video frames, one sample per 0.5 sec
+    repeat = int(fps * RpaJRAVideoReadTime.VIDEO_INTERVAL)
+    writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for img in frames:
+        if (img.shape[1], img.shape[0]) != size:
+            img = cv2.resize(img, size, interpolation=cv2.INTER_CUBIC)
+        for i in range(repeat):
+            writer.write(img)
+    writer.release()
+
+    return repeat
+
+
+@pytest.mark.parametrize('fps, size', [
+    (2, (video.REFERENCE_WIDTH, video.REFERENCE_HEIGHT)),
+    (2, (1920, 1080)),
+    (4, (video.REFERENCE_WIDTH, video.REFERENCE_HEIGHT))
+])
+def test_video_reads_like_png(tmp_path, png_race, race_frames, fps, size):
+    filename = str(tmp_path / 'race.mp4')
+    repeat = write_race_video(filename, race_frames, fps, size)
+
+    png = RpaJRAVideoReadTime(png_race, rcw=True)
+    recording = RpaJRAVideoReadTime(filename, rcw=True, video_path=filename)
+    assert len(recording.video) == len(race_frames)
+
+    time_stamps = recording.read_time()
+    assert [t['ts'] for t in time_stamps] == [t['ts'] for t in png.read_time()]
+    assert [t.get('additional', False) for t in time_stamps] == [t.get('additional', False) for t in png.time_stamps]
+
+    for lazy in (False, True):
+        expected = get_frame_numbers(t['file'] for t in png.find_snap_shop(LAPS, lazy=lazy))
+        output = recording.find_snap_shop(LAPS, lazy=lazy)
+        assert get_frame_numbers(t['file'] for t in output) == [frame * repeat for frame in expected]
+
+    expected = get_frame_numbers(png.get_trimed_list(single_pass=True))
+    assert len(expected) > 0
+    assert get_frame_numbers(recording.get_trimed_list()) == [frame * repeat for frame in expected]
@@ -0,0 +1,51 @@
+import json
+import argparse
+import logging
+import logging.config
+
+from k2kvideo import batch
+from k2kvideo import model
+from k2kvideo import ocr
+from k2kvideo import train
+
+
+logging.config.fileConfig('logging.ini', disable_existing_loggers=False)
+logger = logging.getLogger(__name__)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train a smaller digit model from captured races and compare it')
+    parser.add_argument('races', help='JSON or JSON lines file of {"id", "rcw"}')
+    parser.add_argument('--step', default='2x2', help='Keep one pixel per block of this size')
+    parser.add_argument('--components', type=int, default=None, help='PCA components on the kept pixels')
+    parser.add_argument('--C', type=float, default=1.0)
+    parser.add_argument('--max-frames', type=int, default=None, help='Frames per race')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--dst', default=model.get_asset_path(model.FAST_MODEL_FILE_NAME))
+    parser.add_argument('--dry-run', action='store_true', help='Do not save the trained model')
+    args = parser.parse_args()
+
+    races = batch.load_races(args.races)
+    X, y, groups = train.gen_digit_dataset(races, args.max_frames)
+    train_mask, test_mask = train.split_dataset(groups)
+    logger.info('Dataset : {} cells, {} train, {} test'.format(len(X), train_mask.sum(), test_mask.sum()))
+
+    shape = (ocr.RpaJRAVideoReadTime.UNIT_HIGHT, ocr.RpaJRAVideoReadTime.UNIT_WIDTH)
+    step = tuple(int(size) for size in args.step.split('x'))
+    candidate = train.train_model(X[train_mask], y[train_mask], shape, step, args.components, args.C)
+
+    reference = model.model_registry.get(model.find_model_file())
+    result = train.evaluate(reference, candidate, X[test_mask], y[test_mask], args.repeat)
+    logger.info('Result : {}'.format(json.dumps(result, sort_keys=True)))
+    logger.info('Agreement with the current model : {:.2%} on {} held out cells'.format(
+        result['agreement'], result['samples']))
+    logger.info('Per frame : {:.0f} -> {:.0f} cells/sec, x{:.2f}'.format(
+        result['reference_cells_per_sec'], result['candidate_cells_per_sec'],
+        result['candidate_cells_per_sec'] / result['reference_cells_per_sec']))
+    logger.info('Batched   : {:.0f} -> {:.0f} cells/sec, x{:.2f}'.format(
+        result['reference_batch_cells_per_sec'], result['candidate_batch_cells_per_sec'],
+        result['candidate_batch_cells_per_sec'] / result['reference_batch_cells_per_sec']))
+
+    if args.dry_run == False:
+        candidate.save(args.dst)
+        logger.info('Saved {} : {} features'.format(args.dst, candidate.coef_.shape[1]))